@@ -5,12 +5,16 @@ from grant.utils.misc import gen_random_id
 
 class AdminLog(db.Model):
     __tablename__ = "admin_log"
+    # the log is only ever paged newest first, (date_created, id) is the keyset cursor
+    __table_args__ = (
+        db.Index('ix_admin_log_date_created_id', 'date_created', 'id'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime, nullable=False)
     event = db.Column(db.String(255), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True, index=True)
     ip = db.Column(db.String(255), nullable=False)
 
     user = db.relationship("User")
@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from grant.extensions import cache, db
+from grant.milestone.models import Milestone
+from grant.proposal.models import Proposal
+from grant.rfw.models import RFW, RFWMilestone, RFWMilestoneClaim, RFWWorker
+from grant.user.models import User
+from grant.utils.enums import ProposalStatus, MilestoneStage, RFWWorkerStatus, RFWMilestoneClaimStage
+
+STATS_CACHE_KEY = 'admin:stats'
+TREND_WEEKS = 12
+TREND_MONTHS = 12
+
+
+def dashboard_counts():
+    """The dashboard's counts, one aggregate subquery per table cross joined into a single statement."""
+    users = db.session.query(func.count(User.id).label('users')).subquery()
+    proposals = db.session.query(
+        func.count(Proposal.id).label('proposals'),
+        func.count(Proposal.id).filter(Proposal.status == ProposalStatus.PENDING).label('pending'),
+    ).subquery()
+    payouts = db.session.query(func.count(Milestone.id).label('payouts')) \
+        .join(Proposal, Proposal.id == Milestone.proposal_id) \
+        .filter(Proposal.status == ProposalStatus.LIVE) \
+        .filter(Milestone.stage == MilestoneStage.REQUESTED) \
+        .subquery()
+    workers = db.session.query(func.count(RFWWorker.id).label('workers')) \
+        .join(RFW, RFW.id == RFWWorker.rfw_id) \
+        .filter(RFWWorker.status == RFWWorkerStatus.REQUESTED) \
+        .subquery()
+    claims = db.session.query(func.count(RFWMilestoneClaim.id).label('claims')) \
+        .join(RFWMilestone, RFWMilestone.id == RFWMilestoneClaim.milestone_id) \
+        .join(RFW, RFW.id == RFWMilestone.rfw_id) \
+        .filter(RFWMilestoneClaim.stage == RFWMilestoneClaimStage.REQUESTED) \
+        .subquery()
+    row = db.session.query(
+        users.c.users,
+        proposals.c.proposals,
+        proposals.c.pending,
+        payouts.c.payouts,
+        workers.c.workers,
+        claims.c.claims,
+    ).one()
+    return {
+        "userCount": row.users,
+        "proposalCount": row.proposals,
+        "proposalPendingCount": row.pending,
+        "proposalMilestonePayoutsCount": row.payouts,
+        "rfwWorkerRequestCount": row.workers,
+        "rfwMilestoneClaimCount": row.claims,
+    }
+
+
+def week_start(d: date):
+    return d - timedelta(days=d.weekday())
+
+
+def month_start(d: date):
+    return d.replace(day=1)
+
+
+def months_before(d: date, months: int):
+    index = d.year * 12 + d.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def truncate(unit: str, column):
+    # week buckets start on monday like postgres' date_trunc, sqlite (tests) has no date_trunc
+    if db.engine.dialect.name == 'postgresql':
+        return func.date_trunc(unit, column)
+    if unit == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.date(column, 'start of month')
+
+
+def bucket_counts(column, unit: str, starts: list, condition=None):
+    """[{date, count}] for each bucket in `starts`, counting rows by `unit` truncated `column`."""
+    bucket = truncate(unit, column)
+    query = db.session.query(bucket, func.count()) \
+        .filter(column >= datetime.combine(starts[0], datetime.min.time()))
+    if condition is not None:
+        query = query.filter(condition)
+    # postgres returns timestamps and sqlite iso strings, both start with the date
+    counts = {str(b)[:10]: n for b, n in query.group_by(bucket).all()}
+    return [{"date": s.isoformat(), "count": counts.get(s.isoformat(), 0)} for s in starts]
+
+
+def dashboard_trends(today: date = None):
+    today = today or date.today()
+    this_week = week_start(today)
+    weeks = [this_week - timedelta(weeks=i) for i in reversed(range(TREND_WEEKS))]
+    months = [months_before(month_start(today), i) for i in reversed(range(TREND_MONTHS))]
+    return {
+        "proposalsPerWeek": bucket_counts(Proposal.date_created, 'week', weeks),
+        "payoutsPerMonth": bucket_counts(
+            Milestone.date_paid,
+            'month',
+            months,
+            Milestone.stage == MilestoneStage.PAID,
+        ),
+    }
+
+
+def dashboard_stats():
+    """
+    Counts and trends for the admin dashboard, cached for ADMIN_STATS_CACHE_TIMEOUT
+    seconds. Nothing invalidates the entry, the dashboard tolerates that much lag.
+    """
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = dashboard_counts()
+        stats["trends"] = dashboard_trends()
+        cache.set(STATS_CACHE_KEY, stats, timeout=current_app.config['ADMIN_STATS_CACHE_TIMEOUT'])
+    return stats
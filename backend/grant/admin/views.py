@@ -4,14 +4,13 @@ from functools import reduce
 
 from flask import Blueprint, request
 from marshmallow import fields, validate
-from sqlalchemy import func, or_, text
+from sqlalchemy import or_, text
 
 import grant.utils.admin as admin
 import grant.utils.auth as auth
 from grant.comment.models import Comment, user_comments_schema, admin_comments_schema, admin_comment_schema
 from grant.email.send import generate_email, send_email
 from grant.extensions import db
-from grant.milestone.models import Milestone
 from grant.parser import body, query, paginated_fields
 from grant.proposal.models import (
     Proposal,
@@ -24,6 +23,7 @@ from grant.tag import models as tag_models
 from grant.user.models import User, UserSettings, admin_users_schema, admin_user_schema
 from grant.history.models import HistoryEvent, history_event_schema
 from grant.utils import pagination
+from grant.utils.conditional import bump_bulk
 from grant.utils.enums import Category
 from grant.utils.enums import (
     ProposalStatus,
@@ -31,10 +31,9 @@ from grant.utils.enums import (
     MilestoneStage,
     RFPStatus,
     RFWStatus,
-    RFWWorkerStatus,
-    RFWMilestoneClaimStage
 )
 from grant.utils.misc import make_url
+from . import stats as admin_stats
 from .example_emails import example_email_args
 
 blueprint = Blueprint('admin', __name__, url_prefix='/api/v1/admin')
@@ -135,34 +134,7 @@ def logout():
 @blueprint.route("/stats", methods=["GET"])
 @admin.admin_auth_required
 def stats():
-    user_count = db.session.query(func.count(User.id)).scalar()
-    proposal_count = db.session.query(func.count(Proposal.id)).scalar()
-    proposal_pending_count = db.session.query(func.count(Proposal.id)) \
-        .filter(Proposal.status == ProposalStatus.PENDING) \
-        .scalar()
-    proposal_milestone_payouts_count = db.session.query(func.count(Proposal.id)) \
-        .join(Proposal.milestones) \
-        .filter(Proposal.status == ProposalStatus.LIVE) \
-        .filter(Milestone.stage == MilestoneStage.REQUESTED) \
-        .scalar()
-    rfw_worker_requests_count = db.session.query(func.count(rfw_models.RFW.id)) \
-        .join(rfw_models.RFWWorker) \
-        .filter(rfw_models.RFWWorker.status == RFWWorkerStatus.REQUESTED) \
-        .scalar()
-    rfw_milestone_claim_count = db.session.query(func.count(rfw_models.RFW.id)) \
-        .join(rfw_models.RFWMilestone) \
-        .join(rfw_models.RFWMilestoneClaim) \
-        .filter(rfw_models.RFWMilestoneClaim.stage == RFWMilestoneClaimStage.REQUESTED) \
-        .scalar()
-
-    return {
-        "userCount": user_count,
-        "proposalCount": proposal_count,
-        "proposalPendingCount": proposal_pending_count,
-        "proposalMilestonePayoutsCount": proposal_milestone_payouts_count,
-        "rfwWorkerRequestCount": rfw_worker_requests_count,
-        "rfwMilestoneClaimCount": rfw_milestone_claim_count,
-    }
+    return admin_stats.dashboard_stats()
 
 
 # USERS
@@ -175,6 +147,8 @@ def delete_user(user_id):
     if not user:
         return {"message": "No user matching that id"}, 404
 
+    followed = Proposal.drop_follower_counts(user.id)
+    bump_bulk('proposal', followed)
     db.session.delete(user)
     admin.admin_log("USER_DELETE", f"Deleted user {user.id} ({user.display_name})")
     db.session.commit()
@@ -184,7 +158,7 @@ def delete_user(user_id):
 @blueprint.route("/users", methods=["GET"])
 @query(paginated_fields)
 @admin.admin_auth_required
-def get_users(page, filters, search, sort):
+def get_users(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.user(
         schema=admin_users_schema,
@@ -193,6 +167,7 @@ def get_users(page, filters, search, sort):
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
 
@@ -251,13 +226,53 @@ def edit_user(user_id, silenced, banned, banned_reason, is_admin):
     return admin_user_schema.dump(user)
 
 
+@blueprint.route('/users', methods=['PUT'])
+@body({
+    "ids": fields.List(fields.Int(), required=False, missing=None),
+    "filters": fields.List(fields.Str(), required=False, missing=None),
+    "silenced": fields.Bool(required=False, missing=None),
+    "banned": fields.Bool(required=False, missing=None),
+    "bannedReason": fields.Str(required=False, missing=None),
+})
+@admin.admin_auth_required
+def bulk_edit_users(ids, filters, silenced, banned, banned_reason):
+    if not ids and not filters:
+        return {"message": "Select users by ids or filters"}, 400
+    if banned and not banned_reason:
+        return {"message": "Please include reason for banning"}, 417
+    try:
+        selection = admin.bulk_selection(User, pagination.user_filters, ids, filters)
+    except pagination.PaginationException as e:
+        return {"message": str(e)}, 400
+
+    actions = []
+    updated = set()
+    if silenced is not None:
+        changed = admin.bulk_set_flag(User, selection, User.silenced, silenced)
+        if changed:
+            actions.append(f"{'Silenced' if silenced else 'Unsilenced'} {len(changed)} users: {admin.id_list(changed)}")
+        updated.update(changed)
+    if banned is not None:
+        changed = admin.bulk_set_flag(User, selection, User.banned, banned, banned_reason=banned_reason)
+        if changed and banned:
+            actions.append(f"Banned {len(changed)} users for reason '{banned_reason}': {admin.id_list(changed)}")
+        elif changed:
+            actions.append(f"Unbanned {len(changed)} users: {admin.id_list(changed)}")
+        updated.update(changed)
+
+    if updated:
+        admin.admin_log("USER_BULK_MODERATE", '. '.join(actions))
+    db.session.commit()
+    return {"ids": sorted(updated)}
+
+
 # PROPOSALS
 
 
 @blueprint.route("/proposals", methods=["GET"])
 @query(paginated_fields)
 @admin.admin_auth_required
-def get_proposals(page, filters, search, sort):
+def get_proposals(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.proposal(
         schema=proposals_schema,
@@ -266,6 +281,7 @@ def get_proposals(page, filters, search, sort):
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
 
@@ -304,6 +320,33 @@ def update_proposal(id, private):
     return proposal_schema.dump(proposal)
 
 
+@blueprint.route('/proposals', methods=['PUT'])
+@body({
+    "ids": fields.List(fields.Int(), required=False, missing=None),
+    "filters": fields.List(fields.Str(), required=False, missing=None),
+    "private": fields.Bool(required=False, missing=None),
+})
+@admin.admin_auth_required
+def bulk_update_proposals(ids, filters, private):
+    if not ids and not filters:
+        return {"message": "Select proposals by ids or filters"}, 400
+    try:
+        selection = admin.bulk_selection(Proposal, pagination.proposal_filters, ids, filters)
+    except pagination.PaginationException as e:
+        return {"message": str(e)}, 400
+
+    updated = []
+    if private is not None:
+        updated = admin.bulk_set_flag(Proposal, selection, Proposal.private, private)
+    if updated:
+        admin.admin_log(
+            "PROPOSAL_BULK_MODERATE",
+            f"Made {len(updated)} proposals {'private' if private else 'public'}: {admin.id_list(updated)}"
+        )
+    db.session.commit()
+    return {"ids": sorted(updated)}
+
+
 @blueprint.route('/proposals/<id>/approve', methods=['PUT'])
 @body({
     "isApprove": fields.Bool(required=True),
@@ -535,13 +578,14 @@ def delete_rfp(rfp_id):
 @blueprint.route('/comments', methods=['GET'])
 @query(paginated_fields)
 @admin.admin_auth_required
-def get_comments(page, filters, search, sort):
+def get_comments(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.comment(
         page=page,
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
         schema=admin_comments_schema
     )
     return page
@@ -572,6 +616,47 @@ def edit_comment(comment_id, hidden, reported):
     return admin_comment_schema.dump(comment)
 
 
+@blueprint.route('/comments', methods=['PUT'])
+@body({
+    "ids": fields.List(fields.Int(), required=False, missing=None),
+    "filters": fields.List(fields.Str(), required=False, missing=None),
+    "hidden": fields.Bool(required=False, missing=None),
+    "reported": fields.Bool(required=False, missing=None),
+})
+@admin.admin_auth_required
+def bulk_edit_comments(ids, filters, hidden, reported):
+    if not ids and not filters:
+        return {"message": "Select comments by ids or filters"}, 400
+    try:
+        selection = admin.bulk_selection(Comment, pagination.comment_filters, ids, filters)
+    except pagination.PaginationException as e:
+        return {"message": str(e)}, 400
+
+    actions = []
+    updated = set()
+    if hidden is not None:
+        changed = admin.bulk_set_flag(Comment, selection, Comment.hidden, hidden)
+        if changed:
+            # comments_count only counts visible comments
+            proposal_ids = [id for (id,) in db.session.query(Comment.proposal_id)
+                            .filter(Comment.id.in_(changed))
+                            .distinct()]
+            Proposal.reconcile_counts(proposal_ids)
+            actions.append(f"{'Hid' if hidden else 'Unhid'} {len(changed)} comments: {admin.id_list(changed)}")
+        updated.update(changed)
+    if reported is not None:
+        changed = admin.bulk_set_flag(Comment, selection, Comment.reported, reported)
+        if changed:
+            verb = 'Reported' if reported else 'Cleared reports on'
+            actions.append(f"{verb} {len(changed)} comments: {admin.id_list(changed)}")
+        updated.update(changed)
+
+    if updated:
+        admin.admin_log("COMMENT_BULK_MODERATE", '. '.join(actions))
+    db.session.commit()
+    return {"ids": sorted(updated)}
+
+
 # RFWs (Requests for Work)
 
 
@@ -608,7 +693,7 @@ def create_rfw(**kwargs):
 @blueprint.route('/rfws/<rfw_id>', methods=['GET'])
 @admin.admin_auth_required
 def get_rfw(rfw_id):
-    rfw = rfw_models.RFW.query.get(rfw_id)
+    rfw = rfw_models.RFW.query.options(*rfw_models.RFW.graph_options()).get(rfw_id)
     if not rfw:
         return {"message": "No RFW matching that id"}, 404
     return rfw_models.rfw_schemas.single_admin.dump(rfw)
@@ -747,13 +832,14 @@ def delete_tag(tag_id):
 @blueprint.route('/history', methods=['GET'])
 @query(paginated_fields)
 @admin.admin_auth_required
-def get_history(page, filters, search, sort):
+def get_history(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.history(
         page=page,
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
 
@@ -845,12 +931,13 @@ def delete_history(history_event_id):
 @blueprint.route("/logs", methods=["GET"])
 @query(paginated_fields)
 @admin.admin_auth_required
-def get_admin_logs(page, filters, search, sort):
+def get_admin_logs(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.admin_log(
         page=page,
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
@@ -11,11 +11,13 @@ from flask_sslify import SSLify
 from sentry_sdk.integrations.flask import FlaskIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 from grant import commands, proposal, rfw, user, comment, milestone, admin, email, task, rfp, e2e, history
-from grant.extensions import bcrypt, migrate, db, ma, security, limiter
+from grant.extensions import bcrypt, migrate, db, ma, security, limiter, cache
 from grant.settings import SENTRY_RELEASE, ENV, E2E_TESTING, DEBUG, CORS_DOMAINS
 from grant.utils.auth import AuthException, handle_auth_error, get_authed_user
+from grant.utils import instrumentation
 from grant.utils.exceptions import ValidationException
 from grant.utils.misc import camel_to_words
+from grant.utils.pagination import PaginationException
 
 
 class JSONResponse(Response):
@@ -32,12 +34,14 @@ class JSONResponse(Response):
 def create_app(config_objects=["grant.settings"]):
     app = Flask(__name__.split(".")[0])
     app.response_class = JSONResponse
+    # first so its after_request runs last and times the other handlers too
+    instrumentation.init_app(app)
 
     @app.after_request
     def send_emails(response):
-        if 'email_sender' in g:
-            # starting email sender
-            g.email_sender.start()
+        if 'email_outbox' in g:
+            # hand queued mail to the outbox, `flask run-email-worker` delivers it
+            email.outbox.queue_envelopes(g.pop('email_outbox'))
         return response
 
     # Return validation errors
@@ -45,6 +49,11 @@ def create_app(config_objects=["grant.settings"]):
     def handle_validation_error(err):
         return jsonify({"message": str(err)}), 400
 
+    # Bad cursors, sorts & filters from list query params
+    @app.errorhandler(PaginationException)
+    def handle_pagination_error(err):
+        return jsonify({"message": str(err)}), 400
+
     @app.errorhandler(422)
     @app.errorhandler(400)
     def handle_error(err):
@@ -117,6 +126,7 @@ def register_extensions(app):
     migrate.init_app(app, db)
     ma.init_app(app)
     limiter.init_app(app)
+    cache.init_app(app)
     user_datastore = SQLAlchemyUserDatastore(db, user.models.User, user.models.Role)
     security.init_app(app, datastore=user_datastore, register_blueprint=False)
 
@@ -160,8 +170,15 @@ def register_commands(app):
     app.cli.add_command(commands.lint)
     app.cli.add_command(commands.clean)
     app.cli.add_command(commands.urls)
+    app.cli.add_command(commands.benchmark_serializers)
     app.cli.add_command(proposal.commands.create_proposal)
     app.cli.add_command(proposal.commands.create_proposals)
+    app.cli.add_command(proposal.commands.reconcile_proposal_counts)
+    app.cli.add_command(rfw.commands.benchmark_rfws)
     app.cli.add_command(user.commands.set_admin)
     app.cli.add_command(user.commands.create_user)
     app.cli.add_command(task.commands.create_task)
+    app.cli.add_command(task.commands.run_worker)
+    app.cli.add_command(task.commands.archive_tasks)
+    app.cli.add_command(email.commands.run_email_worker)
+    app.cli.add_command(email.commands.benchmark_emails)
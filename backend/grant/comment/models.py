@@ -1,13 +1,26 @@
 import datetime
+from collections import defaultdict
 
 from functools import reduce
 from grant.extensions import ma, db
+from grant.utils.loaders import loader_paths, make_option
 from grant.utils.ma_fields import UnixDate
 from grant.utils.misc import gen_random_id
+from grant.utils.serializers import dump
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.attributes import set_committed_value
 
 HIDDEN_CONTENT = '~~comment removed by admin~~'
 
+# ids are below 2^31, zero padding keeps paths sorting like the tree they describe
+PATH_SEGMENT_WIDTH = 10
+PATH_SEPARATOR = '/'
+
+
+def path_segment(id: int):
+    return f'{id:0{PATH_SEGMENT_WIDTH}d}{PATH_SEPARATOR}'
+
 
 class Comment(db.Model):
     __tablename__ = "comment"
@@ -15,13 +28,29 @@ class Comment(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime)
     content = db.Column(db.Text, nullable=False)
-    hidden = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text("FALSE"))
+    # active_history loads the stored value before a change, Proposal.comments_count reads it
+    hidden = db.column_property(
+        db.Column(db.Boolean, nullable=False, default=False, server_default=db.text("FALSE")),
+        active_history=True,
+    )
     reported = db.Column(db.Boolean, nullable=True, default=False, server_default=db.text("FALSE"))
 
-    parent_comment_id = db.Column(db.Integer, db.ForeignKey("comment.id"), nullable=True)
+    parent_comment_id = db.Column(db.Integer, db.ForeignKey("comment.id"), nullable=True, index=True)
     proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    # materialized ancestry, every comment's path is its parent's path plus its own
+    # segment, so a subtree is one prefix range scan (see migrations/versions/5e9a2c7b1d38_.py)
+    path = db.Column(db.Text, nullable=False)
+    depth = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+
+    __table_args__ = (
+        db.Index('ix_comment_path', 'path', postgresql_ops={'path': 'text_pattern_ops'}),
+        # a proposal's top level comments, and Comment.get_by_user
+        db.Index('ix_comment_proposal_id_parent_comment_id_hidden', 'proposal_id', 'parent_comment_id', 'hidden'),
+        db.Index('ix_comment_user_id_date_created', 'user_id', 'date_created'),
+    )
+
     user = db.relationship("User", back_populates="comments")
 
 
@@ -35,6 +64,9 @@ class Comment(db.Model):
         self.parent_comment_id = parent_comment_id
         self.content = content[:1000]
         self.date_created = datetime.datetime.now()
+        parent = Comment.query.get(parent_comment_id) if parent_comment_id else None
+        self.path = (parent.path if parent else '') + path_segment(self.id)
+        self.depth = parent.depth + 1 if parent else 0
 
     @staticmethod
     def get_by_user(user):
@@ -48,10 +80,32 @@ class Comment(db.Model):
         self.reported = reported
         db.session.add(self)
 
+    def subtree(self, max_depth: int = None):
+        """Query for every reply under this comment, down to `max_depth` levels below it."""
+        query = Comment.query.filter(
+            Comment.path.startswith(self.path),
+            Comment.depth > self.depth,
+        )
+        if max_depth is not None:
+            query = query.filter(Comment.depth <= self.depth + max_depth)
+        return query
+
     def hide(self, hidden: bool):
         self.hidden = hidden
         db.session.add(self)
 
+    def live_replies(self):
+        # already pruned when the thread came from load_threads
+        pruned = self.__dict__.get('pruned_replies')
+        return filter_dead(self.replies) if pruned is None else pruned
+
+
+def live_condition():
+    # filter_dead as a query condition, the same index backed lookup of direct replies
+    child = db.aliased(Comment)
+    has_live_reply = db.exists().where(and_(child.parent_comment_id == Comment.id, child.hidden == False))
+    return or_(Comment.hidden == False, has_live_reply)
+
 
 # are all of the replies hidden?
 def all_hidden(replies):
@@ -63,6 +117,35 @@ def filter_dead(replies):
     return [x for x in replies if not (x.hidden and all_hidden(x.replies))]
 
 
+def load_threads(roots: list, schema=None):
+    """
+    Load every reply under `roots` with one query, a path prefix range scan per
+    root, and fill in their replies so dumping the threads never lazy loads level
+    by level. Dead replies (see filter_dead) are pruned in the same pass.
+    """
+    if not roots:
+        return roots
+    # eager load whatever else the schema dumps (authors), replies are built below
+    paths = [p for p in loader_paths(Comment, schema or comments_schema) if p[0][1].key != 'replies']
+    nodes = Comment.query \
+        .filter(or_(*[Comment.path.startswith(root.path) for root in roots])) \
+        .options(*[make_option(p) for p in paths]) \
+        .order_by(Comment.date_created, Comment.id) \
+        .all()
+
+    children = defaultdict(list)
+    for node in nodes:
+        if node.parent_comment_id is not None:
+            children[node.parent_comment_id].append(node)
+    for node in nodes:
+        replies = children[node.id]
+        set_committed_value(node, 'replies', replies)
+        node.pruned_replies = [
+            r for r in replies if not (r.hidden and all(c.hidden for c in children[r.id]))
+        ]
+    return roots
+
+
 class CommentSchema(ma.Schema):
     class Meta:
         model = Comment
@@ -90,7 +173,7 @@ class CommentSchema(ma.Schema):
 
     # filter out "dead" comments
     def get_replies(self, obj):
-        return comments_schema.dump(filter_dead(obj.replies))
+        return dump(comments_schema, obj.live_replies())
 
 
 comment_schema = CommentSchema()
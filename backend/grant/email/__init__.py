@@ -1,2 +1,4 @@
 from . import models
 from . import views
+from . import commands
+from . import outbox
@@ -0,0 +1,54 @@
+import timeit
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from grant.settings import EMAIL_WORKER_CONCURRENCY, EMAIL_WORKER_BATCH_SIZE, EMAIL_WORKER_POLL_SECONDS
+from . import outbox
+from .render import render_cache
+from .send import generate_email, get_info_lookup
+
+
+@click.command()
+@click.option('--concurrency', default=EMAIL_WORKER_CONCURRENCY, help='Number of emails sent concurrently')
+@click.option('--batch-size', default=EMAIL_WORKER_BATCH_SIZE, help='Number of emails claimed per poll')
+@click.option('--poll-seconds', default=EMAIL_WORKER_POLL_SECONDS, help='Sleep between polls when idle')
+@click.option('--once', default=False, is_flag=True, help='Exit once the outbox is empty')
+@with_appcontext
+def run_email_worker(concurrency, batch_size, poll_seconds, once):
+    outbox.run_email_worker(
+        current_app._get_current_object(),
+        concurrency=concurrency,
+        batch_size=batch_size,
+        poll_seconds=poll_seconds,
+        once=once,
+    )
+
+
+@click.command()
+@click.option('--iterations', default=50, help='Renders timed per email type')
+@with_appcontext
+def benchmark_emails(iterations):
+    """Time generate_email for every email type, with and without the render cache."""
+    from grant.admin.example_emails import example_email_args
+
+    print(f'{"type":<32}{"cold ms":>10}{"warm ms":>10}')
+    cold_total = warm_total = 0
+    for type in get_info_lookup:
+        args = example_email_args[type]
+
+        def cold():
+            render_cache.clear()
+            generate_email(type, args)
+
+        cold_ms = timeit.timeit(cold, number=iterations) * 1000 / iterations
+        render_cache.clear()
+        generate_email(type, args)
+        warm_ms = timeit.timeit(lambda: generate_email(type, args), number=iterations) * 1000 / iterations
+        cold_total += cold_ms
+        warm_total += warm_ms
+        print(f'{type:<32}{cold_ms:>10.3f}{warm_ms:>10.3f}')
+    count = len(get_info_lookup)
+    print(f'{"mean":<32}{cold_total / count:>10.3f}{warm_total / count:>10.3f}')
+    render_cache.clear()
@@ -1,6 +1,8 @@
 from datetime import datetime
 from datetime import timedelta
 
+from sqlalchemy import or_
+
 from grant.extensions import ma, db
 from grant.utils.misc import gen_random_code
 
@@ -69,3 +71,54 @@ class EmailRecoverySchema(ma.Schema):
 
 
 email_recovery_schema = EmailRecoverySchema()
+
+
+# outbox
+class EmailOutbox(db.Model):
+    """Rendered mail waiting to be delivered by `flask run-email-worker`."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index(
+            'ix_email_outbox_pending_send_after',
+            'send_after',
+            postgresql_where=db.text('sent_at IS NULL AND NOT dead'),
+            sqlite_where=db.text('sent_at IS NULL AND NOT dead'),
+        ),
+    )
+
+    id = db.Column(db.Integer(), primary_key=True)
+    date_created = db.Column(db.DateTime, nullable=False)
+    to_address = db.Column(db.String(255), nullable=False)
+    type = db.Column(db.String(255), nullable=False)
+    # sendgrid v3 mail/send request body, as json
+    payload = db.Column(db.Text, nullable=False)
+    send_after = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer(), default=0, nullable=False, server_default=db.text("0"))
+    last_error = db.Column(db.Text, nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    dead = db.Column(db.Boolean, default=False, nullable=False, server_default=db.text("FALSE"))
+
+    @staticmethod
+    def due(now: datetime):
+        return EmailOutbox.query \
+            .filter(EmailOutbox.send_after <= now) \
+            .filter(EmailOutbox.sent_at == None) \
+            .filter(EmailOutbox.dead == False) \
+            .filter(or_(EmailOutbox.claimed_until == None, EmailOutbox.claimed_until <= now))
+
+    def mark_sent(self):
+        self.sent_at = datetime.now()
+        self.claimed_until = None
+        db.session.add(self)
+
+    def mark_failed(self, error: str, transient: bool, max_attempts: int, backoff: timedelta):
+        # transient failures are retried with exponential backoff, anything else is dead right away
+        self.attempts += 1
+        self.last_error = error
+        self.claimed_until = None
+        if not transient or self.attempts >= max_attempts:
+            self.dead = True
+        else:
+            self.send_after = datetime.now() + backoff * pow(2, self.attempts - 1)
+        db.session.add(self)
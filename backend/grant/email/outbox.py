@@ -0,0 +1,198 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from sentry_sdk import capture_exception
+
+from grant.extensions import db
+from grant.settings import (
+    SENDGRID_API_KEY,
+    E2E_TESTING,
+    EMAIL_TRANSPORT,
+    EMAIL_WORKER_CONCURRENCY,
+    EMAIL_WORKER_BATCH_SIZE,
+    EMAIL_WORKER_POLL_SECONDS,
+    EMAIL_CLAIM_SECONDS,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_RETRY_BACKOFF_SECONDS,
+)
+from .models import EmailOutbox
+
+SENDGRID_SEND_URL = 'https://api.sendgrid.com/v3/mail/send'
+SENDGRID_TIMEOUT = 10
+# rate limited or sendgrid having a bad time, worth another try later
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# transports run on pool threads without an app context, so not current_app.logger
+log = logging.getLogger(__name__)
+
+
+class EmailDeliveryException(Exception):
+    def __init__(self, message: str, transient: bool):
+        super().__init__(message)
+        self.transient = transient
+
+
+class SendGridTransport:
+    """Posts to the SendGrid v3 api over a single pooled session."""
+
+    def __init__(self, api_key: str, pool_size: int = EMAIL_WORKER_CONCURRENCY):
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    def send(self, payload: dict):
+        try:
+            res = self.session.post(SENDGRID_SEND_URL, json=payload, timeout=SENDGRID_TIMEOUT)
+        except requests.RequestException as e:
+            raise EmailDeliveryException(f'{e.__class__.__name__}: {e}', transient=True)
+        if res.status_code >= 400:
+            raise EmailDeliveryException(
+                f'SendGrid responded {res.status_code}: {res.text}',
+                transient=res.status_code in TRANSIENT_STATUS_CODES,
+            )
+        return res.status_code
+
+
+class StubTransport:
+    """Stands in for SendGrid locally, keeps the last few payloads around for inspection."""
+
+    def __init__(self, keep: int = 100):
+        self.sent = deque(maxlen=keep)
+
+    def send(self, payload: dict):
+        self.sent.append(payload)
+        if E2E_TESTING:
+            from grant.e2e import views
+            views.last_email = payload
+        log.info(f'Stub email transport got mail for {payload["personalizations"][0]["to"]}')
+        return 202
+
+
+def make_transport(name: str = EMAIL_TRANSPORT, pool_size: int = EMAIL_WORKER_CONCURRENCY):
+    if name == 'sendgrid':
+        return SendGridTransport(SENDGRID_API_KEY, pool_size=pool_size)
+    if name == 'stub':
+        return StubTransport()
+    raise ValueError(f'Unknown EMAIL_TRANSPORT {name}')
+
+
+def queue_envelopes(envelopes):
+    """
+    Persist rendered Mail envelopes (see send.make_envelope) to the outbox. This runs
+    outside the session so queueing mail never commits whatever the caller has pending.
+    """
+    if not envelopes:
+        return
+    now = datetime.now()
+    rows = [{
+        'date_created': now,
+        'to_address': mail.___to,
+        'type': mail.___type,
+        'payload': json.dumps(mail.get()),
+        'send_after': now,
+        'attempts': 0,
+        'dead': False,
+    } for mail in envelopes]
+    db.engine.execute(EmailOutbox.__table__.insert(), rows)
+    if E2E_TESTING:
+        # e2e runs have no email worker, deliver straight away so tests can pick it up.
+        # On a thread of its own, so claiming commits that thread's session and not the caller's
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=deliver_in_context, args=(app, make_transport('stub')))
+        thread.start()
+        thread.join()
+
+
+def deliver_in_context(app, transport):
+    with app.app_context():
+        try:
+            deliver_due(transport)
+        finally:
+            db.session.remove()
+
+
+def claim_emails(batch_size: int = EMAIL_WORKER_BATCH_SIZE, claim_seconds: int = EMAIL_CLAIM_SECONDS):
+    # same lease scheme as grant.task.worker.claim_tasks
+    now = datetime.now()
+    emails = EmailOutbox.due(now) \
+        .order_by(EmailOutbox.send_after) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True) \
+        .all()
+    for email in emails:
+        email.claimed_until = now + timedelta(seconds=claim_seconds)
+        db.session.add(email)
+    db.session.commit()
+    return emails
+
+
+def send_one(transport, payload: dict):
+    # runs on a pool thread, so only touches the http transport and never the session
+    try:
+        transport.send(payload)
+        return None
+    except EmailDeliveryException as e:
+        return e
+    except Exception as e:
+        return EmailDeliveryException(f'{e.__class__.__name__}: {e}', transient=True)
+
+
+def deliver_due(transport, pool=None, batch_size: int = EMAIL_WORKER_BATCH_SIZE):
+    """Claim and deliver one batch of due mail, returns the number of emails attempted."""
+    emails = claim_emails(batch_size)
+    if not emails:
+        return 0
+    payloads = [json.loads(email.payload) for email in emails]
+    if pool:
+        errors = list(pool.map(lambda payload: send_one(transport, payload), payloads))
+    else:
+        errors = [send_one(transport, payload) for payload in payloads]
+    for email, error in zip(emails, errors):
+        if error is None:
+            email.mark_sent()
+            current_app.logger.info(f'Just sent an email to {email.to_address} of type {email.type}')
+            continue
+        email.mark_failed(
+            str(error),
+            transient=error.transient,
+            max_attempts=EMAIL_MAX_ATTEMPTS,
+            backoff=timedelta(seconds=EMAIL_RETRY_BACKOFF_SECONDS),
+        )
+        current_app.logger.info(f'Failed to send an email to {email.to_address} of type {email.type}: {error}')
+        if email.dead:
+            capture_exception(error)
+    db.session.commit()
+    return len(emails)
+
+
+def run_email_worker(
+        app,
+        concurrency: int = EMAIL_WORKER_CONCURRENCY,
+        batch_size: int = EMAIL_WORKER_BATCH_SIZE,
+        poll_seconds: float = EMAIL_WORKER_POLL_SECONDS,
+        once: bool = False,
+):
+    transport = make_transport(pool_size=concurrency)
+    app.logger.info(f'Email worker started with {transport.__class__.__name__}, concurrency {concurrency}')
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            with app.app_context():
+                try:
+                    count = deliver_due(transport, pool=pool, batch_size=batch_size)
+                finally:
+                    db.session.remove()
+            if once and not count:
+                return
+            if not count:
+                time.sleep(poll_seconds)
@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+from grant.settings import EMAIL_RENDER_CACHE_SIZE
+
+
+class RenderCache:
+    """Thread safe LRU of rendered email layouts."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def layout_key(format: str, info: dict, body: str):
+    # emails/template.{html,txt} only read the title, preview and body of an email,
+    # everything else they render is the same for every email
+    return format, info.get('title'), info.get('preview'), body
+
+
+render_cache = RenderCache(EMAIL_RENDER_CACHE_SIZE)
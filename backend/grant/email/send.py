@@ -1,13 +1,11 @@
 from .subscription_settings import EmailSubscription, is_subscribed
-from sendgrid.helpers.mail import Email, Mail, Content
-from python_http_client import HTTPError
+from sendgrid.helpers.mail import Email, Mail, Content, Personalization, Substitution
 from grant.utils.misc import make_url
-from sentry_sdk import capture_exception
-from grant.settings import SENDGRID_API_KEY, SENDGRID_DEFAULT_FROM, SENDGRID_DEFAULT_FROMNAME, UI
-from grant.settings import SENDGRID_API_KEY, SENDGRID_DEFAULT_FROM, UI, E2E_TESTING
-import sendgrid
-from threading import Thread
-from flask import render_template, Markup, current_app, g
+from grant.extensions import db
+from grant.settings import SENDGRID_DEFAULT_FROM, SENDGRID_DEFAULT_FROMNAME, UI
+from flask import render_template, Markup, current_app, g, has_request_context, escape
+from .outbox import queue_envelopes
+from .render import layout_key, render_cache
 
 
 default_template_args = {
@@ -17,6 +15,11 @@ default_template_args = {
     'unsubscribe_url': make_url('/profile/settings?tab=emails'),
 }
 
+# sendgrid substitutes this per personalization in bulk mail
+UNSUBSCRIBE_URL_TOKEN = '-unsubscribe_url-'
+# sendgrid accepts at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
 
 def signup_info(email_args):
     return {
@@ -291,7 +294,31 @@ get_info_lookup = {
 }
 
 
-def generate_email(type, email_args, user=None):
+def make_unsubscribe_url(code: str):
+    return make_url('/email/unsubscribe?code={}'.format(code))
+
+
+def render_layout(format, info, body):
+    # the shared layout is most of the markup, cached on just what it reads
+    key = layout_key(format, info, body)
+    rendered = render_cache.get(key)
+    if rendered is None:
+        rendered = render_template(
+            'emails/template.%s' % (format),
+            args={
+                **default_template_args,
+                'unsubscribe_url': UNSUBSCRIBE_URL_TOKEN,
+                **info,
+                'body': Markup(body) if format == 'html' else body,
+            },
+            UI=UI,
+        )
+        render_cache.set(key, rendered)
+    return rendered
+
+
+def render_skeleton(type, email_args):
+    # renders everything but the recipient's unsubscribe link, which is left as a token
     info = get_info_lookup[type](email_args)
     body_text = render_template(
         'emails/%s.txt' % (type),
@@ -304,40 +331,36 @@ def generate_email(type, email_args, user=None):
         UI=UI,
     )
 
-    template_args = {**default_template_args}
+    return {
+        'info': info,
+        'html': render_layout('html', info, body_html),
+        'text': render_layout('txt', info, body_text),
+    }
+
+
+def generate_email(type, email_args, user=None, unsubscribe_url=None):
+    skeleton = render_skeleton(type, email_args)
+
     if user:
-        template_args['unsubscribe_url'] = make_url('/email/unsubscribe?code={}'.format(user.email_verification.code))
-
-    html = render_template(
-        'emails/template.html',
-        args={
-            **template_args,
-            **info,
-            'body': Markup(body_html),
-        },
-        UI=UI,
-    )
-    text = render_template(
-        'emails/template.txt',
-        args={
-            **template_args,
-            **info,
-            'body': body_text,
-        },
-        UI=UI,
-    )
+        unsubscribe_url = make_unsubscribe_url(user.email_verification.code)
+    unsubscribe_url = unsubscribe_url or default_template_args['unsubscribe_url']
 
     return {
-        'info': info,
-        'html': html,
-        'text': text
+        'info': {**skeleton['info']},
+        'html': skeleton['html'].replace(UNSUBSCRIBE_URL_TOKEN, str(escape(unsubscribe_url))),
+        'text': skeleton['text'].replace(UNSUBSCRIBE_URL_TOKEN, unsubscribe_url),
     }
 
 
 def send_email(to, type, email_args):
-    if 'email_sender' not in g:
-        g.email_sender = EmailSender(current_app._get_current_object())
-    g.email_sender.add(to, type, email_args)
+    env = make_envelope(to, type, email_args)
+    if not env:
+        return
+    if has_request_context():
+        # queued once the request is done, see send_emails in app.py
+        g.setdefault('email_outbox', []).append(env)
+    else:
+        queue_envelopes([env])
 
 
 def make_envelope(to, type, email_args):
@@ -369,52 +392,61 @@ def make_envelope(to, type, email_args):
     return mail
 
 
-def sendgrid_send(mail, app=current_app):
-    to = mail.___to
-    type = mail.___type
-    try:
-        sg = sendgrid.SendGridAPIClient(apikey=SENDGRID_API_KEY)
-        if E2E_TESTING:
-            from grant.e2e import views
-            views.last_email = mail.get()
-            app.logger.info(f'Just set last_email for e2e to pickup, to: {to}, type: {type}')
-        else:
-            res = sg.client.mail.send.post(request_body=mail.get())
-            app.logger.info('Just sent an email to %s of type %s, response code: %s' %
-                            (to, type, res.status_code))
-    except HTTPError as e:
-        app.logger.info('An HTTP error occured while sending an email to %s - %s: %s' %
-                        (to, e.__class__.__name__, e))
-        app.logger.debug(e.body)
-        capture_exception(e)
-    except Exception as e:
-        app.logger.info('An unknown error occured while sending an email to %s - %s: %s' %
-                        (to, e.__class__.__name__, e))
-        app.logger.debug(e)
-        capture_exception(e)
-
-
-class EmailSender(Thread):
-    def __init__(self, app):
-        Thread.__init__(self)
-        self.envelopes = []
-        self.app = app
-
-    def add(self, to, type, email_args):
-        env = make_envelope(to, type, email_args)
-        if env:
-            self.envelopes.append(env)
-
-    def run(self):
-        for envelope in self.envelopes:
-            sendgrid_send(envelope, self.app)
+def make_bulk_envelopes(type: str, email_args: dict, recipients):
+    """
+    Like make_envelope, but for every user matching the `recipients` criterion
+    (e.g. `User.is_admin == True`). Recipients and their subscription bits are
+    loaded in one query, the body is rendered once and recipients are packed
+    into as few requests as possible, one personalization each.
+    """
+    from grant.user.models import User, UserSettings
+    from .models import EmailVerification
+
+    info = get_info_lookup[type](email_args)
+    query = db.session.query(User.email_address, EmailVerification.code) \
+        .outerjoin(EmailVerification, EmailVerification.user_id == User.id) \
+        .outerjoin(UserSettings, UserSettings.user_id == User.id) \
+        .filter(recipients) \
+        .order_by(User.id)
+    if 'subscription' in info:
+        bit = 1 << info['subscription'].value['bit']
+        query = query.filter(UserSettings._email_subscriptions.op('&')(bit) != 0)
+    rows = query.all()
+    if not rows:
+        return []
+
+    email = generate_email(type, email_args, unsubscribe_url=UNSUBSCRIBE_URL_TOKEN)
+    envelopes = []
+    for i in range(0, len(rows), MAX_PERSONALIZATIONS):
+        chunk = rows[i:i + MAX_PERSONALIZATIONS]
+        mail = Mail()
+        mail.from_email = Email(SENDGRID_DEFAULT_FROM, SENDGRID_DEFAULT_FROMNAME)
+        mail.subject = email['info']['subject']
+        for address, code in chunk:
+            personalization = Personalization()
+            personalization.add_to(Email(address))
+            unsubscribe_url = make_unsubscribe_url(code) if code else default_template_args['unsubscribe_url']
+            personalization.add_substitution(Substitution(UNSUBSCRIBE_URL_TOKEN, unsubscribe_url))
+            mail.add_personalization(personalization)
+        mail.add_content(Content('text/plain', email['text']))
+        mail.add_content(Content('text/html', email['html']))
+
+        mail.___type = type
+        mail.___to = chunk[0][0] if len(chunk) == 1 else f'{chunk[0][0]} and {len(chunk) - 1} others'
+        envelopes.append(mail)
+    return envelopes
+
+
+def send_bulk_email(type: str, email_args: dict, recipients):
+    if current_app and current_app.config.get("TESTING"):
+        return
+    envelopes = make_bulk_envelopes(type, email_args, recipients)
+    if has_request_context():
+        g.setdefault('email_outbox', []).extend(envelopes)
+    else:
+        queue_envelopes(envelopes)
 
 
 def send_admin_email(type: str, email_args: dict):
     from grant.user.models import User
-    admins = User.get_admins()
-    for a in admins:
-        send_email(a.email_address, type, {
-            'user': a,
-            **email_args
-        })
+    send_bulk_email(type, email_args, User.is_admin == True)
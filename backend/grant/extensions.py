@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Extensions module. Each extension is initialized in the app factory located in app.py."""
 from flask_bcrypt import Bcrypt
+from flask_caching import Cache
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from flask_security import Security
@@ -14,3 +15,4 @@ migrate = Migrate()
 ma = Marshmallow()
 security = Security()
 limiter = Limiter(key_func=get_remote_address)
+cache = Cache()
@@ -6,13 +6,16 @@ from grant.utils.misc import gen_random_id, make_url
 
 class HistoryEvent(db.Model):
     __tablename__ = "history_event"
+    __table_args__ = (
+        db.Index('ix_history_event_proposal_id_date', 'proposal_id', 'date'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
 
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
     date = db.Column(db.DateTime, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True, index=True)
     proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=True)
 
     user = db.relationship("User", lazy=True)
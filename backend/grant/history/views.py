@@ -2,17 +2,20 @@ from flask import Blueprint, request
 
 from grant.parser import body, query, paginated_fields
 from grant.utils import pagination
+from grant.utils.cache import cached_response
 
 blueprint = Blueprint('history', __name__, url_prefix='/api/v1/history')
 
 @blueprint.route("/", methods=["GET"])
+@cached_response('history')
 @query(paginated_fields)
-def get_history(page, filters, search, sort):
+def get_history(page, filters, search, sort, cursor):
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.history(
         page=page,
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
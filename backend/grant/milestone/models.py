@@ -13,6 +13,10 @@ class MilestoneException(Exception):
 
 class Milestone(db.Model):
     __tablename__ = "milestone"
+    __table_args__ = (
+        # milestones are always read per proposal in index order
+        db.Index('ix_milestone_proposal_id_index', 'proposal_id', 'index'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     index = db.Column(db.Integer(), nullable=False)
@@ -27,7 +31,7 @@ class Milestone(db.Model):
     stage = db.Column(db.String(255), nullable=False)
 
     date_requested = db.Column(db.DateTime, nullable=True)
-    requested_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    requested_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True, index=True)
 
     date_rejected = db.Column(db.DateTime, nullable=True)
     reject_reason = db.Column(db.String(255))
@@ -2,6 +2,7 @@ import functools
 
 from animal_case import animalify
 from webargs.core import dict2schema
+from webargs.fields import DelimitedList
 from webargs.flaskparser import FlaskParser, abort
 from marshmallow import fields
 from marshmallow.utils import _Missing
@@ -96,5 +97,13 @@ paginated_fields = {
     "page": fields.Int(required=False, missing=None),
     "filters": fields.List(fields.Str(), required=False, missing=[]),
     "search": fields.Str(required=False, missing=None),
-    "sort": fields.Str(required=False, missing=None)
+    "sort": fields.Str(required=False, missing=None),
+    # opt-in keyset pagination, pass an empty cursor for the first page
+    "cursor": fields.Str(required=False, missing=None)
+}
+
+# sparse fieldsets, e.g. ?fields=id,title or ?exclude=content (see grant.utils.projection)
+projection_fields = {
+    "fields": DelimitedList(fields.Str(), required=False, missing=None),
+    "exclude": DelimitedList(fields.Str(), required=False, missing=None),
 }
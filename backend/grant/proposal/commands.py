@@ -9,6 +9,7 @@ from grant.milestone.models import Milestone
 from grant.comment.models import Comment
 from grant.utils.enums import ProposalStatus, Category, ProposalStageEnum
 from grant.user.models import User
+from grant.utils.cache import invalidate
 
 
 @click.command()
@@ -76,3 +77,13 @@ def create_proposals(count):
 
     db.session.commit()
     print(f'Added {count} LIVE fake proposals')
+
+
+@click.command()
+@with_appcontext
+def reconcile_proposal_counts():
+    count = Proposal.reconcile_counts()
+    db.session.commit()
+    # bulk updates skip the session, so cached responses aren't dropped on commit
+    invalidate('proposals')
+    print(f'Reconciled follower & comment counts on {count} proposals')
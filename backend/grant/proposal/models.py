@@ -2,15 +2,15 @@ import datetime
 from decimal import Decimal, ROUND_DOWN
 from functools import reduce
 
-from flask import current_app
+from flask import current_app, g
 from marshmallow import post_dump
-from sqlalchemy import func, or_, select
+from sqlalchemy import event, func, inspect, or_, select
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import column_property
+from sqlalchemy.orm import selectinload
 
 from flask import current_app
 from grant.comment.models import Comment
-from grant.email.send import send_email, send_admin_email
+from grant.email.send import send_email, send_admin_email, send_bulk_email
 from grant.extensions import ma, db
 from grant.utils.enums import (
     ProposalStatus,
@@ -25,23 +25,42 @@ from grant.utils.stubs import anonymous_user
 proposal_team = db.Table(
     'proposal_team', db.Model.metadata,
     db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
-    db.Column('proposal_id', db.Integer, db.ForeignKey('proposal.id'))
+    db.Column('proposal_id', db.Integer, db.ForeignKey('proposal.id')),
+    db.Index('ix_proposal_team_proposal_id_user_id', 'proposal_id', 'user_id'),
+    db.Index('ix_proposal_team_user_id_proposal_id', 'user_id', 'proposal_id')
 )
 
 proposal_follower = db.Table(
     'proposal_follower', db.Model.metadata,
     db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
-    db.Column('proposal_id', db.Integer, db.ForeignKey('proposal.id'))
+    db.Column('proposal_id', db.Integer, db.ForeignKey('proposal.id')),
+    db.Index('ix_proposal_follower_user_id_proposal_id', 'user_id', 'proposal_id'),
+    db.Index('ix_proposal_follower_proposal_id_user_id', 'proposal_id', 'user_id')
 )
 
 
+def get_authed_follows():
+    # ids of every proposal the authed user follows, fetched once per request
+    if 'authed_follows' not in g:
+        from grant.utils.auth import get_authed_user
+        authed = get_authed_user()
+        follows = set()
+        if authed:
+            rows = db.session.query(proposal_follower.c.proposal_id) \
+                .filter(proposal_follower.c.user_id == authed.id) \
+                .all()
+            follows = set(r.proposal_id for r in rows)
+        g.authed_follows = follows
+    return g.authed_follows
+
+
 class ProposalTeamInvite(db.Model):
     __tablename__ = "proposal_team_invite"
 
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime)
 
-    proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=False)
+    proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=False, index=True)
     address = db.Column(db.String(255), nullable=False)
     accepted = db.Column(db.Boolean)
 
@@ -65,7 +84,7 @@ class ProposalUpdate(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime)
 
-    proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=False)
+    proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"), nullable=False, index=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
 
@@ -82,7 +101,7 @@ class Proposal(db.Model):
 
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime)
-    rfp_id = db.Column(db.Integer(), db.ForeignKey('rfp.id'), nullable=True)
+    rfp_id = db.Column(db.Integer(), db.ForeignKey('rfp.id'), nullable=True, index=True)
 
     # Content info
     status = db.Column(db.String(255), nullable=False)
@@ -96,6 +115,10 @@ class Proposal(db.Model):
     reject_reason = db.Column(db.String())
     private = db.Column(db.Boolean, default=False, nullable=False)
 
+    # bumped whenever the proposal or anything nested in it changes, see grant.utils.conditional
+    version = db.Column(db.Integer, default=1, nullable=False, server_default=db.text("1"))
+    date_updated = db.Column(db.DateTime, index=True)
+
     # Payment info
     target = db.Column(db.String(255), nullable=False)
 
@@ -134,17 +157,11 @@ class Proposal(db.Model):
         secondary=proposal_follower,
         back_populates="followed_proposals"
     )
-    followers_count = column_property(
-        select([func.count(proposal_follower.c.proposal_id)])
-        .where(proposal_follower.c.proposal_id == id)
-        .correlate_except(proposal_follower)
-    )
-    comments_count = column_property(
-        select([func.count(Comment.proposal_id)])
-        .where(Comment.proposal_id == id)
-        .where(Comment.hidden != True)
-        .correlate_except(Comment)
-    )
+
+    # Denormalized counters, kept in sync by Proposal.follow and the Comment
+    # listeners below. Run `flask reconcile-proposal-counts` to recompute them.
+    followers_count = db.Column(db.Integer, default=0, nullable=False, server_default=db.text("0"))
+    comments_count = db.Column(db.Integer, default=0, nullable=False, server_default=db.text("0"))
 
     def __init__(
             self,
@@ -165,6 +182,8 @@ class Proposal(db.Model):
         self.category = category
         self.target = target
         self.stage = stage
+        self.followers_count = 0
+        self.comments_count = 0
 
     @staticmethod
     def simple_validate(proposal):
@@ -244,11 +263,49 @@ class Proposal(db.Model):
         return proposal
 
     @staticmethod
-    def get_by_user(user, statuses=[ProposalStatus.LIVE]):
+    def reconcile_counts(ids=None):
+        # recompute the denormalized counters for every proposal (or those in `ids`) in one statement
+        followers = select([func.count(proposal_follower.c.proposal_id)]) \
+            .where(proposal_follower.c.proposal_id == Proposal.id) \
+            .as_scalar()
+        comments = select([func.count(Comment.id)]) \
+            .where(Comment.proposal_id == Proposal.id) \
+            .where(Comment.hidden != True) \
+            .as_scalar()
+        query = Proposal.query
+        if ids is not None:
+            query = query.filter(Proposal.id.in_(ids))
+        return query.update({
+            Proposal.followers_count: followers,
+            Proposal.comments_count: comments,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def drop_follower_counts(user_id):
+        """
+        Take a user about to be deleted off the followers_count of the proposals they follow,
+        their proposal_follower rows go with them without passing through follow().
+        Returns the ids of those proposals.
+        """
+        ids = [id for (id,) in db.session.query(proposal_follower.c.proposal_id)
+               .filter(proposal_follower.c.user_id == user_id)]
+        if ids:
+            Proposal.query.filter(Proposal.id.in_(ids)).update({
+                Proposal.followers_count: Proposal.followers_count - 1,
+            }, synchronize_session=False)
+        return ids
+
+    @staticmethod
+    def get_by_user(user, statuses=[ProposalStatus.LIVE], schema=None):
         from grant.utils.auth import get_authed_user
+        from grant.utils.loaders import loader_options
         authed = get_authed_user()
         status_filter = or_(Proposal.status == v for v in statuses)
+        # load what the caller will dump up front, team is always needed for the private check
+        schema = schema or user_proposals_schema
         res = Proposal.query \
+            .options(*loader_options(Proposal, schema)) \
+            .options(selectinload(Proposal.team)) \
             .join(proposal_team) \
             .filter(proposal_team.c.user_id == user.id) \
             .filter(status_filter) \
@@ -285,13 +342,13 @@ class Proposal(db.Model):
         })
 
     def send_follower_email(self, type: str, email_args={}, url_suffix=''):
-        for u in self.followers:
-            send_email(u.email_address, type, {
-                'user': u,
-                'proposal': self,
-                'proposal_url': make_url(f'/proposals/{self.id}{url_suffix}'),
-                **email_args
-            })
+        from grant.user.models import User
+        followers = select([proposal_follower.c.user_id]).where(proposal_follower.c.proposal_id == self.id)
+        send_bulk_email(type, {
+            'proposal': self,
+            'proposal_url': make_url(f'/proposals/{self.id}{url_suffix}'),
+            **email_args
+        }, User.id.in_(followers))
 
     # state: status (DRAFT || REJECTED) -> PENDING
     def submit_for_approval(self):
@@ -362,11 +419,17 @@ class Proposal(db.Model):
             })
 
     def follow(self, user, is_follow):
+        # repeat follows & unfollows would throw the counter off
+        if (user in self.followers) == is_follow:
+            return
         if is_follow:
             self.followers.append(user)
+            self.followers_count = Proposal.followers_count + 1
         else:
             self.followers.remove(user)
+            self.followers_count = Proposal.followers_count - 1
         db.session.flush()
+        g.pop('authed_follows', None)
 
     @hybrid_property
     def is_failed(self):
@@ -387,16 +450,36 @@ class Proposal(db.Model):
 
     @hybrid_property
     def authed_follows(self):
-        from grant.utils.auth import get_authed_user
-        authed = get_authed_user()
-        if not authed:
-            return False
-        res = db.session.query(proposal_follower) \
-            .filter_by(user_id=authed.id, proposal_id=self.id) \
-            .count()
-        if res:
-            return True
-        return False
+        return self.id in get_authed_follows()
+
+
+def adjust_comments_count(connection, proposal_id, delta):
+    proposals = Proposal.__table__
+    connection.execute(
+        proposals.update()
+        .where(proposals.c.id == proposal_id)
+        .values(comments_count=proposals.c.comments_count + delta)
+    )
+
+
+# keep Proposal.comments_count (visible comments only) in sync with comment inserts, hides & deletes
+@event.listens_for(Comment, "after_insert")
+def comment_inserted(mapper, connection, comment):
+    if not comment.hidden:
+        adjust_comments_count(connection, comment.proposal_id, 1)
+
+
+@event.listens_for(Comment, "after_delete")
+def comment_deleted(mapper, connection, comment):
+    if not comment.hidden:
+        adjust_comments_count(connection, comment.proposal_id, -1)
+
+
+@event.listens_for(Comment, "after_update")
+def comment_updated(mapper, connection, comment):
+    history = inspect(comment).attrs.hidden.history
+    if history.has_changes() and bool(history.deleted and history.deleted[0]) != bool(comment.hidden):
+        adjust_comments_count(connection, comment.proposal_id, -1 if comment.hidden else 1)
 
 
 class ProposalSchema(ma.Schema):
@@ -429,6 +512,10 @@ class ProposalSchema(ma.Schema):
             "comments_count"
         )
 
+    LOADER_HINTS = {
+        "current_milestone": "milestones",
+    }
+
     date_created = ma.Method("get_date_created")
     date_approved = ma.Method("get_date_approved")
     date_published = ma.Method("get_date_published")
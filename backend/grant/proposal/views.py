@@ -7,13 +7,15 @@ from sentry_sdk import capture_message
 from webargs import validate
 
 from grant.extensions import limiter
-from grant.comment.models import Comment, comment_schema, comments_schema
+from grant.comment.models import Comment, comment_schema, comments_schema, live_condition
 from grant.email.send import send_email
 from grant.milestone.models import Milestone
-from grant.parser import body, query, paginated_fields
+from grant.parser import body, query, paginated_fields, projection_fields
 from grant.rfp.models import RFP
 from grant.user.models import User
 from grant.utils import pagination
+from grant.utils.cache import cached_response
+from grant.utils.conditional import conditional_get, last_modified
 from grant.utils.auth import (
     requires_auth,
     requires_team_member_auth,
@@ -23,7 +25,10 @@ from grant.utils.auth import (
 from grant.utils.enums import Category
 from grant.utils.enums import ProposalStatus, ProposalStage
 from grant.utils.exceptions import ValidationException
+from grant.utils.loaders import loader_options
 from grant.utils.misc import is_email, make_url, from_zat
+from grant.utils.projection import project
+from grant.utils.serializers import dump
 from .models import (
     Proposal,
     proposals_schema,
@@ -40,8 +45,14 @@ blueprint = Blueprint("proposal", __name__, url_prefix="/api/v1/proposals")
 
 
 @blueprint.route("/<proposal_id>", methods=["GET"])
-def get_proposal(proposal_id):
-    proposal = Proposal.query.filter_by(id=proposal_id).first()
+@conditional_get(Proposal, 'proposal_id')
+@cached_response('proposals')
+@query(projection_fields)
+def get_proposal(proposal_id, fields, exclude):
+    schema = project(proposal_schema, fields, exclude)
+    proposal = Proposal.query.filter_by(id=proposal_id) \
+        .options(*loader_options(Proposal, schema)) \
+        .first()
     if proposal:
         authed_user = get_authed_user()
         team_ids = list(x.id for x in proposal.team)
@@ -54,14 +65,14 @@ def get_proposal(proposal_id):
         if proposal.private:
             if not authed_in_team:
                 return {"message": "Proposal is private"}, 404
-        return proposal_schema.dump(proposal)
+        return dump(schema, proposal)
     else:
         return {"message": "No proposal matching id"}, 404
 
 
 @blueprint.route("/<proposal_id>/comments", methods=["GET"])
 @query(paginated_fields)
-def get_proposal_comments(proposal_id, page, filters, search, sort):
+def get_proposal_comments(proposal_id, page, filters, search, sort, cursor):
     # only using page, currently
     filters_workaround = request.args.getlist('filters[]')
     page = pagination.comment(
@@ -71,6 +82,28 @@ def get_proposal_comments(proposal_id, page, filters, search, sort):
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
+        threads=True,
+    )
+    return page
+
+
+@blueprint.route("/<proposal_id>/comments/<comment_id>/replies", methods=["GET"])
+@query(paginated_fields)
+def get_proposal_comment_replies(proposal_id, comment_id, page, filters, search, sort, cursor):
+    parent = Comment.query.filter_by(id=comment_id, proposal_id=proposal_id).first()
+    if not parent:
+        return {"message": "No comment matching id"}, 404
+    filters_workaround = request.args.getlist('filters[]')
+    page = pagination.comment(
+        schema=comments_schema,
+        query=parent.subtree(max_depth=1).filter(live_condition()),
+        page=page,
+        filters=filters_workaround,
+        search=search,
+        sort=sort,
+        cursor=cursor,
+        threads=True,
     )
     return page
 
@@ -170,20 +203,23 @@ def post_proposal_comments(proposal_id, comment, parent_comment_id):
 
 
 @blueprint.route("/", methods=["GET"])
-@query(paginated_fields)
-def get_proposals(page, filters, search, sort):
+@last_modified(Proposal)
+@cached_response('proposals')
+@query({**paginated_fields, **projection_fields})
+def get_proposals(page, filters, search, sort, cursor, fields, exclude):
     filters_workaround = request.args.getlist('filters[]')
     query = Proposal.query.filter_by(status=ProposalStatus.LIVE) \
         .filter(Proposal.stage != ProposalStage.CANCELED) \
         .filter(Proposal.stage != ProposalStage.FAILED) \
         .filter(Proposal.private != True)
     page = pagination.proposal(
-        schema=proposals_schema,
+        schema=project(proposals_schema, fields, exclude),
         query=query,
         page=page,
         filters=filters_workaround,
         search=search,
         sort=sort,
+        cursor=cursor,
     )
     return page
 
@@ -1,6 +1,7 @@
 from flask import Blueprint
 from sqlalchemy import or_
 
+from grant.utils.cache import cached_response
 from grant.utils.enums import RFPStatus
 from .models import RFP, rfp_schema, rfps_schema
 
@@ -8,6 +9,7 @@ blueprint = Blueprint("rfp", __name__, url_prefix="/api/v1/rfps")
 
 
 @blueprint.route("/", methods=["GET"])
+@cached_response('rfps')
 def get_rfps():
     rfps = RFP.query \
         .filter(or_(
@@ -20,6 +22,7 @@ def get_rfps():
 
 
 @blueprint.route("/<rfp_id>", methods=["GET"])
+@cached_response('rfps')
 def get_rfp(rfp_id):
     rfp = RFP.query.filter_by(id=rfp_id).first()
     if not rfp or rfp.status == RFPStatus.DRAFT:
@@ -1,2 +1,3 @@
+from . import commands
 from . import models
 from . import views
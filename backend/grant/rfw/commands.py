@@ -0,0 +1,109 @@
+import time
+from datetime import datetime
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+
+from grant.extensions import db
+from grant.user.models import User
+from grant.utils.enums import Category, RFWStatus, RFWWorkerStatus, RFWMilestoneClaimStage
+from grant.utils.instrumentation import QueryStats
+from grant.utils.loaders import loader_options
+from grant.utils.misc import gen_random_id
+from .models import RFW, RFWMilestone, RFWWorker, RFWMilestoneClaim, rfw_schemas
+
+
+def insert_board(rfw_count: int, milestone_count: int, worker_count: int):
+    """Bulk insert a synthetic RFW board, every worker has a claim on the first milestone."""
+    now = datetime.now()
+    user_ids = [gen_random_id(User) for _ in range(worker_count)]
+    db.session.execute(User.__table__.insert(), [{
+        'id': id,
+        'email_address': f'benchmark-{id}@example.com',
+        'password': 'benchmark',
+        'display_name': f'Benchmark {id}',
+        'is_admin': False,
+    } for id in user_ids])
+    rfws, milestones, workers, claims = [], [], [], []
+    for i in range(rfw_count):
+        rfw_id = gen_random_id(RFW)
+        rfws.append({
+            'id': rfw_id,
+            'date_created': now,
+            'title': f'Benchmark RFW {i}',
+            'brief': 'brief',
+            'content': 'content',
+            'status': RFWStatus.LIVE,
+            'category': Category.COMMUNITY,
+            'bounty': milestone_count,
+            'effort_from': 0,
+            'effort_to': milestone_count,
+        })
+        milestone_ids = [gen_random_id(RFWMilestone) for _ in range(milestone_count)]
+        milestones.extend({
+            'id': id,
+            'index': index,
+            'date_created': now,
+            'title': f'Milestone {index}',
+            'content': 'content',
+            'effort_from': 0,
+            'effort_to': 1,
+            'bounty': 1,
+            'rfw_id': rfw_id,
+        } for index, id in enumerate(milestone_ids))
+        for user_id in user_ids:
+            worker_id = gen_random_id(RFWWorker)
+            workers.append({
+                'id': worker_id,
+                'date_created': now,
+                'status': RFWWorkerStatus.ACCEPTED,
+                'status_message': 'benchmark',
+                'status_change_date': now,
+                'rfw_id': rfw_id,
+                'user_id': user_id,
+            })
+            claims.append({
+                'id': gen_random_id(RFWMilestoneClaim),
+                'date_created': now,
+                'stage': RFWMilestoneClaimStage.REQUESTED,
+                'stage_message': 'benchmark',
+                'stage_change_date': now,
+                'stage_url': 'https://example.com',
+                'worker_id': worker_id,
+                'milestone_id': milestone_ids[0],
+            })
+    for model, rows in [(RFW, rfws), (RFWMilestone, milestones), (RFWWorker, workers), (RFWMilestoneClaim, claims)]:
+        db.session.execute(model.__table__.insert(), rows)
+    return [r['id'] for r in rfws]
+
+
+@click.command()
+@click.option('--rfws', default=1000, help='RFWs on the synthetic board')
+@click.option('--milestones', default=5, help='Milestones per RFW')
+@click.option('--workers', default=10, help='Workers per RFW')
+@with_appcontext
+def benchmark_rfws(rfws, milestones, workers):
+    """Time dumping a synthetic RFW board lazily, with schema loaders and with RFW.graph_options."""
+    schema = rfw_schemas.list
+    strategies = [
+        ('lazy', lambda: []),
+        ('loader_options', lambda: loader_options(RFW, schema)),
+        ('graph_options', lambda: RFW.graph_options(schema)),
+    ]
+    try:
+        ids = insert_board(rfws, milestones, workers)
+        click.echo(f'{"strategy":<18}{"queries":>10}{"db ms":>12}{"total ms":>12}')
+        for name, options in strategies:
+            # a fresh identity map each run, so nothing is served from a previous one
+            db.session.expire_all()
+            with current_app.test_request_context():
+                g.query_stats = stats = QueryStats()
+                started = time.perf_counter()
+                board = RFW.query.filter(RFW.id.in_(ids)).options(*options()).all()
+                schema.dump(board)
+                total_ms = (time.perf_counter() - started) * 1000
+            click.echo(f'{name:<18}{stats.count:>10}{stats.db_seconds * 1000:>12.1f}{total_ms:>12.1f}')
+    finally:
+        # the board is never committed
+        db.session.rollback()
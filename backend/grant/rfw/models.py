@@ -4,11 +4,14 @@ from grant.utils.misc import dt_to_unix, gen_random_id, get
 from grant.utils.enums import RFWStatus, RFWWorkerStatus, RFWMilestoneClaimStage
 from grant.tag.models import TagAssociation, TagSchema, Tag
 from datetime import datetime
+from itertools import chain
 from decimal import Decimal
 from grant.extensions import ma, db
+from sqlalchemy import event
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import selectinload, validates
 from grant.utils.auth import get_authed_user
+from grant.utils.loaders import loader_paths, make_option
 
 
 class RFWException(Exception):
@@ -29,8 +32,8 @@ class RFWMilestoneClaim(db.Model):
     stage_change_date = db.Column(db.DateTime, nullable=False)
     stage_url = db.Column(db.String, nullable=False)
 
-    worker_id = db.Column(db.Integer(), db.ForeignKey('rfw_worker.id'))
-    milestone_id = db.Column(db.Integer(), db.ForeignKey('rfw_milestone.id'))
+    worker_id = db.Column(db.Integer(), db.ForeignKey('rfw_worker.id'), index=True)
+    milestone_id = db.Column(db.Integer(), db.ForeignKey('rfw_milestone.id'), index=True)
     worker = db.relationship(
         "RFWWorker",
         back_populates="claims"
@@ -101,6 +104,9 @@ class RFWMilestoneClaimSchema(ma.Schema):
 # # # # # # # # # # # # # # # # # # # # # # # #
 class RFWMilestone(db.Model):
     __tablename__ = 'rfw_milestone'
+    __table_args__ = (
+        db.Index('ix_rfw_milestone_rfw_id_index', 'rfw_id', 'index'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     index = db.Column(db.Integer(), nullable=False)
@@ -190,6 +196,10 @@ class RFWMilestoneSchema(ma.Schema):
 # # # # # # # # # # # # # # # # # # # # # # # #
 class RFWWorker(db.Model):
     __tablename__ = 'rfw_worker'
+    __table_args__ = (
+        # matches RFWWorker.get_work
+        db.Index('ix_rfw_worker_user_id_status', 'user_id', 'status'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     date_created = db.Column(db.DateTime)
@@ -199,7 +209,7 @@ class RFWWorker(db.Model):
     status_change_date = db.Column(db.DateTime, nullable=True)
 
     # relations
-    rfw_id = db.Column(db.Integer(), db.ForeignKey('rfw.id'))
+    rfw_id = db.Column(db.Integer(), db.ForeignKey('rfw.id'), index=True)
     user_id = db.Column(db.Integer(), db.ForeignKey('user.id'))
     rfw = db.relationship('RFW', back_populates='workers')
     user = db.relationship('User', back_populates='rfws')
@@ -211,12 +221,12 @@ class RFWWorker(db.Model):
             work = RFWWorker.query.filter_by(user_id=user_id) \
                 .order_by(RFWWorker.status_change_date.desc()) \
                 .all()
-            work_dump = RFWWorkerSchema(many=True).dump(work)
+            work_dump = rfw_workers_schema.dump(work)
         else:
             work = RFWWorker.query.filter_by(user_id=user_id, status=RFWWorkerStatus.ACCEPTED) \
                 .order_by(RFWWorker.status_change_date.desc()) \
                 .all()
-            work_dump = RFWWorkerSchema(many=True, exclude=['status_message']).dump(work)
+            work_dump = rfw_workers_public_schema.dump(work)
             for w in work_dump:
                 w['claims'] = [c for c in w['claims'] if c['stage'] == RFWMilestoneClaimStage.ACCEPTED]
         return work_dump
@@ -276,6 +286,10 @@ class RFWWorkerSchema(ma.Schema):
     claims = ma.Nested("RFWMilestoneClaimSchema", many=True, exclude=['worker'])
 
 
+rfw_workers_schema = RFWWorkerSchema(many=True)
+rfw_workers_public_schema = RFWWorkerSchema(many=True, exclude=['status_message'])
+
+
 # # # # # # # # # # # # # # # # # # # # # # # #
 #   RFW (Request For Work)
 # # # # # # # # # # # # # # # # # # # # # # # #
@@ -292,6 +306,22 @@ class RFW(db.Model):
     status_change_date = db.Column(db.DateTime, nullable=True)
     category = db.Column(db.String(255), nullable=False)
 
+    # bumped whenever the rfw or anything nested in it changes, see grant.utils.conditional
+    version = db.Column(db.Integer, default=1, nullable=False, server_default=db.text("1"))
+    date_updated = db.Column(db.DateTime, index=True)
+
+    # milestone rollups, kept up to date on flush (see refresh_rfw_totals) so lists
+    # can sort and filter on them without loading milestones
+    _bounty = db.Column(
+        "bounty", db.BigInteger, nullable=False, default=0, server_default=db.text("0"), index=True
+    )
+    _effort_from = db.Column(
+        "effort_from", db.BigInteger, nullable=False, default=0, server_default=db.text("0"), index=True
+    )
+    _effort_to = db.Column(
+        "effort_to", db.BigInteger, nullable=False, default=0, server_default=db.text("0"), index=True
+    )
+
     # Relationships
     workers = db.relationship(
         'RFWWorker',
@@ -310,17 +340,18 @@ class RFW(db.Model):
         back_populates="rfws"
     )
 
+    # read only, set through the milestones
     @hybrid_property
-    def effort_from(self):
-        return sum([ms.effort_from for ms in self.milestones])
+    def bounty(self):
+        return self._bounty
 
     @hybrid_property
-    def effort_to(self):
-        return sum([ms.effort_to for ms in self.milestones])
+    def effort_from(self):
+        return self._effort_from
 
     @hybrid_property
-    def bounty(self):
-        return sum([ms.bounty for ms in self.milestones])
+    def effort_to(self):
+        return self._effort_to
 
     @hybrid_property
     def authed_worker(self):
@@ -366,6 +397,30 @@ class RFW(db.Model):
         db.session.flush()
         return rfw
 
+    @staticmethod
+    def graph_options(schema=None):
+        """
+        Eager loader options for the worker / milestone / claim / tag graph of RFWs,
+        a fixed number of selectin round-trips however many RFWs are loaded.
+        Claims point back at workers and milestones loaded here, and those
+        many-to-one lookups are served from the identity map without queries.
+        Passing `schema` leaves out branches it doesn't dump.
+        """
+        from grant.user.models import User, user_schema
+        dumped = set(schema.fields) if schema else {'workers', 'milestones', 'tags'}
+        options = []
+        if dumped & {'workers', 'authed_worker', 'milestones'}:
+            # milestones' claims reference workers, and is_authed_active reads them
+            options.append(selectinload(RFW.workers).selectinload(RFWWorker.claims))
+            worker_user = [('selectinload', RFW.workers), ('joinedload', RFWWorker.user)]
+            options.append(make_option(worker_user))
+            options.extend(make_option(worker_user + path) for path in loader_paths(User, user_schema))
+        if 'milestones' in dumped:
+            options.append(selectinload(RFW.milestones).selectinload(RFWMilestone.claims))
+        if 'tags' in dumped:
+            options.append(selectinload(RFW.tags))
+        return options
+
     def check_live(self):
         if self.status != RFWStatus.LIVE:
             raise RFWException(f'RFW must be {RFWStatus.LIVE}, was {self.status}')
@@ -395,6 +450,12 @@ class RFW(db.Model):
             self.add_tag_by_id(tag_id)
         db.session.flush()
 
+    def refresh_totals(self):
+        # milestone values come straight from request json, so may be strings
+        self._bounty = sum(int(ms.bounty or 0) for ms in self.milestones)
+        self._effort_from = sum(int(ms.effort_from or 0) for ms in self.milestones)
+        self._effort_to = sum(int(ms.effort_to or 0) for ms in self.milestones)
+
     def check_milestone_integrity(self):
         milestones = sorted(self.milestones, key=lambda x: x.index)
         for ind, ms in enumerate(milestones):
@@ -525,6 +586,19 @@ class RFW(db.Model):
         self.set_status(RFWStatus.CLOSED)
 
 
+@event.listens_for(db.session, 'before_flush')
+def refresh_rfw_totals(session, flush_context, instances):
+    rfws = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, RFWMilestone) and obj.rfw is not None:
+            rfws.add(obj.rfw)
+        # a removed milestone no longer points at its rfw, but the rfw's collection changed
+        elif isinstance(obj, RFW) and (obj in session.new or 'milestones' in obj.__dict__):
+            rfws.add(obj)
+    for rfw in rfws - set(session.deleted):
+        rfw.refresh_totals()
+
+
 class RFWSchema(ma.Schema):
     class Meta:
         additional = (
@@ -534,10 +608,14 @@ class RFWSchema(ma.Schema):
             "content",
             "status",
             "category",
-            "bounty",  # derived from ms
-            "effort_from",  # derived from ms
-            "effort_to",  # derived from ms
+            "bounty",  # rolled up from ms
+            "effort_from",  # rolled up from ms
+            "effort_to",  # rolled up from ms
         )
+    LOADER_HINTS = {
+        "authed_worker": "workers",
+    }
+
     date_created = UnixDate(attribute='date_created')
     status_change_date = UnixDate(attribute='status_change_date')
     workers = ma.Nested("RFWWorkerSchema", many=True, exclude=['rfw'])
@@ -4,10 +4,13 @@ from grant.extensions import db
 from grant.utils import pagination
 from grant.rfw import models as rfw_models
 from grant.tag import models as tag_models
-from grant.parser import body, query, paginated_fields
+from grant.parser import body, query, paginated_fields, projection_fields
 from grant.utils.enums import RFWStatus
 from grant.utils.auth import requires_email_verified_auth
+from grant.utils.cache import cached_response
+from grant.utils.conditional import conditional_get, last_modified
 from grant.utils.misc import make_admin_url
+from grant.utils.projection import project
 from grant.email.send import send_admin_email
 from marshmallow import fields
 from webargs import validate
@@ -31,11 +34,13 @@ def rfw_exists_check(id):
 
 
 @blueprint.route("/", methods=["GET"])
-@query(paginated_fields)
-def get_rfws(**kwargs):
+@last_modified(RFW)
+@cached_response('rfws')
+@query({**paginated_fields, **projection_fields})
+def get_rfws(fields, exclude, **kwargs):
     query = RFW.query.filter(RFW.status != RFWStatus.DRAFT)
     page = pagination.rfw(
-        schema=rfw_schemas.list,
+        schema=project(rfw_schemas.list, fields, exclude),
         query=query,
         **kwargs,
     )
@@ -43,9 +48,12 @@ def get_rfws(**kwargs):
 
 
 @blueprint.route("/<id>", methods=["GET"])
-def get_rfw(id):
+@conditional_get(RFW, 'id')
+@cached_response('rfws')
+@query(projection_fields)
+def get_rfw(id, fields, exclude):
     rfw = rfw_exists_check(id)
-    return rfw_schemas.single.dump(rfw)
+    return project(rfw_schemas.single, fields, exclude).dump(rfw)
 
 
 @blueprint.route("/<id>/worker/request", methods=["POST"])
@@ -25,7 +25,21 @@ SECRET_KEY = env.str("SECRET_KEY")
 BCRYPT_LOG_ROUNDS = env.int("BCRYPT_LOG_ROUNDS", default=13)
 DEBUG_TB_ENABLED = DEBUG
 DEBUG_TB_INTERCEPT_REDIRECTS = False
-CACHE_TYPE = "simple"  # Can be "memcached", "redis", etc.
+# in-process LRU by default, "redis" (with CACHE_REDIS_URL) shares the cache between dynos
+CACHE_TYPE = env.str("CACHE_TYPE", default="grant.utils.cache.lru_cache")
+CACHE_REDIS_URL = env.str("CACHE_REDIS_URL", default=None)
+CACHE_THRESHOLD = env.int("CACHE_THRESHOLD", default=1000)
+# commits only drop cached responses in the backend they can reach, so without a shared one
+# writes from the workers or another dyno would be served stale until the timeout
+RESPONSE_CACHE_ENABLED = env.bool("RESPONSE_CACHE_ENABLED", default=CACHE_TYPE == "redis")
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=60)
+# admin dashboard counts & trends, see grant/admin/stats.py
+ADMIN_STATS_CACHE_TIMEOUT = env.int("ADMIN_STATS_CACHE_TIMEOUT", default=30)
+# generated dump functions on hot list paths, see grant/utils/serializers.py
+FAST_SERIALIZERS = env.bool("FAST_SERIALIZERS", default=True)
+# per request query counts & db time as Server-Timing headers and log lines
+INSTRUMENTATION_ENABLED = env.bool("INSTRUMENTATION_ENABLED", default=False)
+QUERY_BUDGET = env.int("QUERY_BUDGET", default=25)
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 # so backend session cookies are first-party
@@ -34,10 +48,34 @@ CORS_DOMAINS = env.str('CORS_DOMAINS', default='*')
 
 EIP_712_URL = env.str('EIP_712_URL', default='https://eip-712.herokuapp.com')
 
+# keys the permutation behind public ids (grant.utils.ids), must never change once ids are issued.
+# Anyone who knows the key can map ids back to counters, so only development has a default
+PUBLIC_ID_KEY = env.str("PUBLIC_ID_KEY", default="grant-public-ids") if DEBUG else env.str("PUBLIC_ID_KEY")
+
+# task worker (flask run-worker)
+TASK_WORKER_POOL_SIZE = env.int("TASK_WORKER_POOL_SIZE", default=4)
+TASK_WORKER_BATCH_SIZE = env.int("TASK_WORKER_BATCH_SIZE", default=10)
+TASK_WORKER_POLL_SECONDS = env.float("TASK_WORKER_POLL_SECONDS", default=5)
+TASK_CLAIM_SECONDS = env.int("TASK_CLAIM_SECONDS", default=300)
+TASK_MAX_ATTEMPTS = env.int("TASK_MAX_ATTEMPTS", default=5)
+TASK_RETRY_BACKOFF_SECONDS = env.int("TASK_RETRY_BACKOFF_SECONDS", default=60)
+TASK_RETENTION_DAYS = env.int("TASK_RETENTION_DAYS", default=30)
+
 SENDGRID_API_KEY = env.str("SENDGRID_API_KEY", default="")
 SENDGRID_DEFAULT_FROM = env.str("SENDGRID_DEFAULT_FROM", default="noreply@grants.urbit.org")
 SENDGRID_DEFAULT_FROMNAME = env.str("SENDGRID_DEFAULT_FROMNAME", default="Urbit Grants")
 
+# "sendgrid" or "stub", the stub only logs mail and is the default without an api key
+EMAIL_TRANSPORT = env.str("EMAIL_TRANSPORT", default="sendgrid" if SENDGRID_API_KEY else "stub")
+EMAIL_WORKER_CONCURRENCY = env.int("EMAIL_WORKER_CONCURRENCY", default=4)
+EMAIL_WORKER_BATCH_SIZE = env.int("EMAIL_WORKER_BATCH_SIZE", default=50)
+EMAIL_WORKER_POLL_SECONDS = env.float("EMAIL_WORKER_POLL_SECONDS", default=2)
+EMAIL_CLAIM_SECONDS = env.int("EMAIL_CLAIM_SECONDS", default=300)
+EMAIL_MAX_ATTEMPTS = env.int("EMAIL_MAX_ATTEMPTS", default=5)
+EMAIL_RETRY_BACKOFF_SECONDS = env.int("EMAIL_RETRY_BACKOFF_SECONDS", default=30)
+# rendered email layouts kept per (title, preview, body), 0 disables the cache
+EMAIL_RENDER_CACHE_SIZE = env.int("EMAIL_RENDER_CACHE_SIZE", default=256)
+
 SENTRY_DSN = env.str("SENTRY_DSN", default=None)
 SENTRY_RELEASE = env.str("SENTRY_RELEASE", default=None)
 
@@ -8,6 +8,10 @@ class TagException(Exception):
 
 class TagAssociation(db.Model):
     __tablename__ = "tag_association"
+    __table_args__ = (
+        db.Index('ix_tag_association_rfw_id_tag_id', 'rfw_id', 'tag_id'),
+        db.Index('ix_tag_association_tag_id_rfw_id', 'tag_id', 'rfw_id'),
+    )
     id = db.Column(db.Integer(), primary_key=True)
     rfw_id = db.Column(db.Integer, db.ForeignKey('rfw.id'))
     # can add more parent ids so different types can refer to same tags, ex:
@@ -1,9 +1,17 @@
 import ast
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 
+from grant.settings import (
+    TASK_WORKER_POOL_SIZE,
+    TASK_WORKER_BATCH_SIZE,
+    TASK_WORKER_POLL_SECONDS,
+    TASK_RETENTION_DAYS,
+)
+from . import worker
 from .models import Task, db
 
 
@@ -15,3 +23,29 @@ def create_task(job_type, blob):
     task = Task(ast.literal_eval(job_type), ast.literal_eval(blob), datetime.now())
     db.session.add(task)
     db.session.commit()
+
+
+@click.command()
+@click.option('--pool-size', default=TASK_WORKER_POOL_SIZE, help='Number of tasks run concurrently')
+@click.option('--batch-size', default=TASK_WORKER_BATCH_SIZE, help='Number of tasks claimed per poll')
+@click.option('--poll-seconds', default=TASK_WORKER_POLL_SECONDS, help='Sleep between polls when idle')
+@click.option('--once', default=False, is_flag=True, help='Exit once no tasks are due')
+@with_appcontext
+def run_worker(pool_size, batch_size, poll_seconds, once):
+    worker.run_worker(
+        current_app._get_current_object(),
+        pool_size=pool_size,
+        batch_size=batch_size,
+        poll_seconds=poll_seconds,
+        once=once,
+    )
+
+
+@click.command()
+@click.option('--days', default=TASK_RETENTION_DAYS, help='Archive completed tasks older than this many days')
+@click.option('--batch-size', default=1000, help='Number of tasks moved per transaction')
+@with_appcontext
+def archive_tasks(days, batch_size):
+    before = datetime.now() - timedelta(days=days)
+    count = Task.archive_completed(before, batch_size=batch_size)
+    print(f'Archived {count} completed tasks from before {before}')
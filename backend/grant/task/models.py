@@ -1,6 +1,8 @@
 import json
+from datetime import datetime, timedelta
 
 from grant.extensions import ma, db
+from sqlalchemy import or_
 from sqlalchemy.ext import mutable
 
 from .jobs import JOBS
@@ -28,6 +30,15 @@ mutable.MutableDict.associate_with(JsonEncodedDict)
 
 class Task(db.Model):
     __tablename__ = 'task'
+    __table_args__ = (
+        # the worker only ever looks for pending tasks, keep the index to those
+        db.Index(
+            'ix_task_pending_execute_after',
+            'execute_after',
+            postgresql_where=db.text('NOT completed'),
+            sqlite_where=db.text('NOT completed'),
+        ),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     job_type = db.Column(db.Integer(), nullable=False)
@@ -35,11 +46,83 @@ class Task(db.Model):
     execute_after = db.Column(db.DateTime, nullable=False)
     completed = db.Column(db.Boolean, default=False)
 
+    # worker bookkeeping (see grant.task.worker)
+    attempts = db.Column(db.Integer(), default=0, nullable=False, server_default=db.text("0"))
+    last_error = db.Column(db.Text, nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    # dead-lettered tasks ran out of retries and are never picked up again
+    dead = db.Column(db.Boolean, default=False, nullable=False, server_default=db.text("FALSE"))
+
     def __init__(self, job_type, blob, execute_after):
         assert job_type in list(JOBS.keys()), "Not a valid job"
         self.job_type = job_type
         self.blob = blob
         self.execute_after = execute_after
+        self.attempts = 0
+        self.dead = False
+
+    @staticmethod
+    def due(now: datetime):
+        return Task.query \
+            .filter(Task.execute_after <= now) \
+            .filter(Task.completed == False) \
+            .filter(Task.dead == False) \
+            .filter(or_(Task.claimed_until == None, Task.claimed_until <= now))
+
+    def mark_completed(self):
+        self.completed = True
+        self.claimed_until = None
+        db.session.add(self)
+
+    def mark_failed(self, error: str, max_attempts: int, backoff: timedelta):
+        # retry with exponential backoff, dead-letter once out of attempts
+        self.attempts += 1
+        self.last_error = error
+        self.claimed_until = None
+        if self.attempts >= max_attempts:
+            self.dead = True
+        else:
+            self.execute_after = datetime.now() + backoff * pow(2, self.attempts - 1)
+        db.session.add(self)
+
+    @staticmethod
+    def archive_completed(before: datetime, batch_size: int = 1000):
+        """
+        Move completed tasks due before `before` into task_archive, batch_size rows
+        per transaction. Returns the number of tasks archived.
+        """
+        columns = [c.name for c in Task.__table__.columns]
+        archived = 0
+        while True:
+            ids = [r[0] for r in db.session.query(Task.id)
+                .filter(Task.completed == True)
+                .filter(Task.execute_after < before)
+                .order_by(Task.id)
+                .limit(batch_size)
+                .all()]
+            if not ids:
+                return archived
+            rows = db.select([Task.__table__.c[c] for c in columns]).where(Task.id.in_(ids))
+            db.session.execute(TaskArchive.__table__.insert().from_select(columns, rows))
+            db.session.execute(Task.__table__.delete().where(Task.id.in_(ids)))
+            db.session.commit()
+            archived += len(ids)
+
+
+class TaskArchive(db.Model):
+    """Completed tasks moved out of the task table by `flask archive-tasks`."""
+    __tablename__ = 'task_archive'
+
+    id = db.Column(db.Integer(), primary_key=True, autoincrement=False)
+    job_type = db.Column(db.Integer(), nullable=False)
+    blob = db.Column(JsonEncodedDict, nullable=False)
+    execute_after = db.Column(db.DateTime, nullable=False)
+    completed = db.Column(db.Boolean)
+    attempts = db.Column(db.Integer(), nullable=False, server_default=db.text("0"))
+    last_error = db.Column(db.Text, nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    dead = db.Column(db.Boolean, nullable=False, server_default=db.text("FALSE"))
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
 
 
 class TaskSchema(ma.Schema):
@@ -51,7 +134,10 @@ class TaskSchema(ma.Schema):
             "job_type",
             "blob",
             "execute_after",
-            "completed"
+            "completed",
+            "attempts",
+            "last_error",
+            "dead"
         )
 
 
@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from traceback import format_exc
+
+from flask import current_app
+from sentry_sdk import capture_exception
+
+from grant.extensions import db
+from grant.settings import (
+    TASK_WORKER_POOL_SIZE,
+    TASK_WORKER_BATCH_SIZE,
+    TASK_WORKER_POLL_SECONDS,
+    TASK_CLAIM_SECONDS,
+    TASK_MAX_ATTEMPTS,
+    TASK_RETRY_BACKOFF_SECONDS,
+)
+from .jobs import JOBS
+from .models import Task
+
+
+def claim_tasks(batch_size: int = TASK_WORKER_BATCH_SIZE, claim_seconds: int = TASK_CLAIM_SECONDS):
+    """
+    Claim up to batch_size due tasks and return their ids. Rows are locked with
+    FOR UPDATE SKIP LOCKED so concurrent workers never claim the same task, and the
+    claim is recorded as a lease (claimed_until) so it survives jobs that commit
+    on their own. Tasks from a crashed worker are picked up again once it expires.
+    """
+    now = datetime.now()
+    tasks = Task.due(now) \
+        .order_by(Task.execute_after) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True) \
+        .all()
+    for task in tasks:
+        task.claimed_until = now + timedelta(seconds=claim_seconds)
+        db.session.add(task)
+    ids = [t.id for t in tasks]
+    db.session.commit()
+    return ids
+
+
+def run_task(task_id: int):
+    # runs one claimed task and commits its outcome on its own
+    task = Task.query.get(task_id)
+    if not task or task.completed or task.dead:
+        return task
+    try:
+        JOBS[task.job_type](task)
+        task.mark_completed()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.info("Task #{} failed: {}".format(task_id, e))
+        capture_exception(e)
+        task = Task.query.get(task_id)
+        task.mark_failed(
+            format_exc(),
+            max_attempts=TASK_MAX_ATTEMPTS,
+            backoff=timedelta(seconds=TASK_RETRY_BACKOFF_SECONDS),
+        )
+        db.session.commit()
+        if task.dead:
+            current_app.logger.warn("Task #{} dead-lettered after {} attempts".format(task_id, task.attempts))
+    return task
+
+
+def run_task_in_context(app, task_id: int):
+    # pool threads each get their own app context, and so their own session
+    with app.app_context():
+        try:
+            run_task(task_id)
+        except Exception as e:
+            # recording the failure failed too, the task runs again once its claim expires
+            app.logger.error("Task #{} could not be run or marked failed: {}".format(task_id, e))
+            capture_exception(e)
+        finally:
+            db.session.remove()
+
+
+def run_worker(
+        app,
+        pool_size: int = TASK_WORKER_POOL_SIZE,
+        batch_size: int = TASK_WORKER_BATCH_SIZE,
+        poll_seconds: float = TASK_WORKER_POLL_SECONDS,
+        once: bool = False,
+):
+    app.logger.info(f'Task worker started, pool size {pool_size}, batch size {batch_size}')
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        while True:
+            with app.app_context():
+                try:
+                    task_ids = claim_tasks(batch_size)
+                finally:
+                    db.session.remove()
+            if task_ids:
+                # wait for the batch so we never hold more claims than we can run
+                list(pool.map(lambda task_id: run_task_in_context(app, task_id), task_ids))
+            if once and not task_ids:
+                return
+            if not task_ids:
+                time.sleep(poll_seconds)
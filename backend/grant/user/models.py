@@ -25,9 +25,12 @@ def is_current_authed_user_id(user_id):
 
 class RolesUsers(db.Model):
     __tablename__ = 'roles_users'
+    __table_args__ = (
+        db.Index('ix_roles_users_user_id_role_id', 'user_id', 'role_id'),
+    )
     id = db.Column(db.Integer(), primary_key=True)
     user_id = db.Column('user_id', db.Integer(), db.ForeignKey('user.id'))
-    role_id = db.Column('role_id', db.Integer(), db.ForeignKey('role.id'))
+    role_id = db.Column('role_id', db.Integer(), db.ForeignKey('role.id'), index=True)
 
 
 class Role(db.Model, RoleMixin):
@@ -43,7 +46,7 @@ class SocialMedia(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
     service = db.Column(db.String(255), unique=False, nullable=False)
     username = db.Column(db.String(255), unique=False, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     def __init__(self, service: str, username: str, user_id):
         self.service = service.upper()[:255]
@@ -55,7 +58,7 @@ class AzimuthPoint(db.Model):
     __tablename__ = "azimuth_point"
 
     point = db.Column(db.String(255), primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     def __init__(self, point: str, user_id):
         self.point = point
@@ -66,7 +69,7 @@ class UserSettings(db.Model):
     __tablename__ = "user_settings"
 
     id = db.Column(db.Integer(), primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     _email_subscriptions = db.Column("email_subscriptions", db.Integer, default=0)  # bitmask
 
     user = db.relationship("User", back_populates="settings")
@@ -95,7 +98,7 @@ class Avatar(db.Model):
 
     id = db.Column(db.Integer(), primary_key=True)
     _image_url = db.Column("image_url", db.String(255), unique=False, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     user = db.relationship("User", back_populates="avatar")
 
     @hybrid_property
@@ -397,6 +400,10 @@ class SelfUserSchema(ma.Schema):
             "is_admin",
         )
 
+    LOADER_HINTS = {
+        "email_verified": "email_verification",
+    }
+
     social_medias = ma.Nested("SocialMediaSchema", many=True)
     avatar = ma.Nested("AvatarSchema")
     azimuth = ma.Nested("AzimuthPointSchema")
@@ -428,6 +435,10 @@ class UserSchema(ma.Schema):
             "email_verified",
         )
 
+    LOADER_HINTS = {
+        "email_verified": "email_verification",
+    }
+
     social_medias = ma.Nested("SocialMediaSchema", many=True)
     avatar = ma.Nested("AvatarSchema")
     azimuth = ma.Nested("AzimuthPointSchema")
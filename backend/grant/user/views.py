@@ -10,7 +10,7 @@ import grant.utils.auth as auth
 from grant.comment.models import Comment, user_comments_schema
 from grant.email.models import EmailRecovery
 from grant.extensions import limiter
-from grant.parser import query, body
+from grant.parser import query, body, projection_fields
 from grant.proposal.models import (
     Proposal,
     ProposalTeamInvite,
@@ -20,6 +20,7 @@ from grant.proposal.models import (
 import grant.rfw.models as rfw_models
 from grant.utils.enums import ProposalStatus
 from grant.utils.exceptions import ValidationException
+from grant.utils.projection import project
 from grant.utils.social import verify_social, get_social_login_url, VerifySocialException
 from grant.utils.upload import remove_avatar, sign_avatar_upload, AvatarException
 from grant.utils.azimuth import validate_azimuth_signature
@@ -49,11 +50,12 @@ def get_me():
     "withComments": fields.Bool(required=False, missing=None),
     "withPending": fields.Bool(required=False, missing=None),
     "withWork": fields.Bool(required=False, missing=None),
+    **projection_fields,
 })
-def get_user(user_id, with_proposals, with_comments, with_pending, with_work):
+def get_user(user_id, with_proposals, with_comments, with_pending, with_work, fields, exclude):
     user = User.get_by_id(user_id)
     if user:
-        result = user_schema.dump(user)
+        result = project(user_schema, fields, exclude).dump(user)
         authed_user = auth.get_authed_user()
         is_self = authed_user and authed_user.id == user.id
         if with_proposals:
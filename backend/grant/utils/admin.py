@@ -6,10 +6,15 @@ from .totp_2fa import gen_backup_codes, gen_otp_secret, gen_uri, verify_totp, ve
 from hashlib import sha256
 
 from flask import session, request, current_app
+from sqlalchemy import event
+
 from grant.extensions import db
 from grant.settings import SECRET_KEY
 from grant.user.models import User
 from grant.admin.models import AdminLog
+from grant.utils.cache import invalidate_on_commit
+from grant.utils.conditional import bump_bulk
+from grant.utils.misc import gen_random_id
 
 
 def admin_is_authed():
@@ -124,13 +129,71 @@ def admin_auth_required(f):
 
 
 def admin_log(event, message):
+    """
+    Queue an audit log entry on the session, see write_admin_logs. Entries are
+    written with the mutation they describe when it commits, and dropped with it
+    on rollback.
+    """
     user = get_authed_user()
-    log = AdminLog(
-        event=event,
-        message=message,
-        user_id=user.id if user else None,
-        ip=request.remote_addr,
-    )
-    db.session.add(log)
+    entry = {
+        'id': gen_random_id(AdminLog),
+        'date_created': datetime.now(),
+        'event': event,
+        'message': message,
+        'user_id': user.id if user else None,
+        'ip': request.remote_addr,
+    }
+    db.session.info.setdefault('admin_logs', []).append(entry)
     current_app.logger.info(f"Admin Log - {event}: {message}")
-    return log
+    return entry
+
+
+@event.listens_for(db.session, 'before_commit')
+def write_admin_logs(session):
+    # one multi-row insert per commit, in the committing transaction
+    entries = session.info.pop('admin_logs', None)
+    if entries:
+        session.execute(AdminLog.__table__.insert(), entries)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_admin_logs(session):
+    session.info.pop('admin_logs', None)
+
+
+def bulk_selection(model, apply_filters, ids: list = None, filters: list = None):
+    """
+    Ids of the rows of `model` a bulk admin action applies to, by id and/or list filters.
+    Collected once up front so every flag of the action applies to the same rows, even
+    when an earlier flag changes whether they match the filters.
+    """
+    query = model.query
+    if ids:
+        query = query.filter(model.id.in_(ids))
+    if filters:
+        query = apply_filters(query, filters)
+    return [id for (id,) in query.with_entities(model.id).distinct()]
+
+
+def bulk_set_flag(model, selection: list, column, value: bool, **values):
+    """
+    Set boolean `column` (and any other `values`) on the `selection` ids it differs on,
+    one SELECT for the ids and one UPDATE. Returns the ids that changed.
+    """
+    if not selection:
+        return []
+    differs = column.isnot(True) if value else column == True
+    ids = [id for (id,) in model.query.filter(model.id.in_(selection), differs).with_entities(model.id)]
+    if ids:
+        model.query.filter(model.id.in_(ids)).update(
+            {column: value, **{getattr(model, k): v for k, v in values.items()}},
+            synchronize_session=False,
+        )
+        # the UPDATE skips the session flush, which normally marks cached responses stale
+        invalidate_on_commit(model.__tablename__)
+        bump_bulk(model.__tablename__, ids)
+    return ids
+
+
+def id_list(ids: list):
+    return ', '.join(str(id) for id in sorted(ids))
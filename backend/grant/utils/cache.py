@@ -0,0 +1,182 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+from uuid import uuid4
+
+from flask import current_app, request
+from sqlalchemy import event
+
+try:
+    from flask_caching.backends.base import BaseCache
+except ImportError:
+    from werkzeug.contrib.cache import BaseCache
+
+from grant.extensions import cache, db
+
+# cached responses a write to each table makes stale, by namespace
+TABLE_NAMESPACES = {
+    'proposal': ('proposals', 'rfps', 'history'),
+    'proposal_update': ('proposals',),
+    'proposal_team_invite': ('proposals',),
+    'milestone': ('proposals',),
+    'comment': ('proposals',),
+    'rfp': ('rfps', 'proposals'),
+    'rfw': ('rfws',),
+    'rfw_milestone': ('rfws',),
+    'rfw_milestone_claim': ('rfws',),
+    'rfw_worker': ('rfws',),
+    'tag': ('rfws',),
+    'tag_association': ('rfws',),
+    'history_event': ('history',),
+    'user': ('proposals', 'rfws', 'history'),
+    'avatar': ('proposals', 'rfws', 'history'),
+    'social_media': ('proposals', 'rfws', 'history'),
+}
+
+
+class LRUCache(BaseCache):
+    """
+    In-process cache that evicts the least recently used entry past `threshold`.
+    Values are pickled like werkzeug's SimpleCache so callers can't mutate them.
+    """
+
+    def __init__(self, threshold=500, default_timeout=300, **kwargs):
+        super().__init__(default_timeout=default_timeout)
+        self.threshold = threshold
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _expires(self, timeout):
+        # like the other backends a timeout of 0 never expires
+        if timeout is None:
+            timeout = self.default_timeout
+        return time.time() + timeout if timeout > 0 else 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires and expires <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        entry = (self._expires(timeout), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.threshold:
+                self.entries.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        return True
+
+
+def lru_cache(app, config, args, kwargs):
+    """Flask-Caching factory, set CACHE_TYPE = 'grant.utils.cache.lru_cache'."""
+    kwargs.update(threshold=config['CACHE_THRESHOLD'])
+    return LRUCache(*args, **kwargs)
+
+
+def namespace_versions(namespaces):
+    keys = [f'namespace:{n}' for n in namespaces]
+    versions = cache.get_many(*keys)
+    for i, version in enumerate(versions):
+        if version is None:
+            versions[i] = uuid4().hex
+            cache.set(keys[i], versions[i], timeout=0)
+    return versions
+
+
+def invalidate(*namespaces):
+    # bumping the version orphans every key built on the old one, which also
+    # works when the backend is shared between processes
+    for n in namespaces:
+        cache.set(f'namespace:{n}', uuid4().hex, timeout=0)
+
+
+def auth_scope():
+    from grant.utils.auth import get_authed_user
+    user = get_authed_user()
+    return f'user:{user.id}' if user else 'anonymous'
+
+
+def response_cache_key(namespaces):
+    args = sorted((k, tuple(request.args.getlist(k))) for k in request.args)
+    raw = repr((request.path, args, auth_scope(), namespace_versions(namespaces)))
+    return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_response(*namespaces):
+    """
+    Cache the JSON-able result of a GET view per route, query args and auth scope.
+    Entries are dropped when a commit touches any table mapped to `namespaces`.
+    Only plain dict/list results are cached, (body, status) tuples are not.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RESPONSE_CACHE_ENABLED'):
+                return f(*args, **kwargs)
+            key = response_cache_key(namespaces)
+            rv = cache.get(key)
+            if rv is not None:
+                return rv
+            rv = f(*args, **kwargs)
+            if isinstance(rv, (dict, list)):
+                cache.set(key, rv, timeout=current_app.config['RESPONSE_CACHE_TIMEOUT'])
+            return rv
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_on_commit(*tables):
+    """Drop the namespaces `tables` map to when the session commits, for bulk writes the flush doesn't see."""
+    pending = db.session.info.setdefault('cache_namespaces', set())
+    for table in tables:
+        pending.update(TABLE_NAMESPACES.get(table, ()))
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_invalidations(session, flush_context):
+    pending = session.info.setdefault('cache_namespaces', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        pending.update(TABLE_NAMESPACES.get(getattr(obj, '__tablename__', None), ()))
+
+
+@event.listens_for(db.session, 'after_commit')
+def apply_invalidations(session):
+    namespaces = session.info.pop('cache_namespaces', None)
+    if namespaces:
+        invalidate(*namespaces)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_invalidations(session):
+    session.info.pop('cache_namespaces', None)
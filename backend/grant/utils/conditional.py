@@ -0,0 +1,230 @@
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import chain
+
+from flask import current_app, make_response, request
+from sqlalchemy import event, func, select
+
+from grant.extensions import db
+from .cache import auth_scope
+
+# tables with version & date_updated columns
+VERSIONED_TABLES = ('proposal', 'rfw')
+
+# which versioned row (table, id) a change to each table shows up in
+VERSIONED_BY = {
+    'proposal': lambda o: ('proposal', o.id),
+    'milestone': lambda o: ('proposal', o.proposal_id),
+    'proposal_update': lambda o: ('proposal', o.proposal_id),
+    'proposal_team_invite': lambda o: ('proposal', o.proposal_id),
+    'comment': lambda o: ('proposal', o.proposal_id),
+    'rfw': lambda o: ('rfw', o.id),
+    'rfw_milestone': lambda o: ('rfw', o.rfw_id),
+    'rfw_worker': lambda o: ('rfw', o.rfw_id),
+    'rfw_milestone_claim': lambda o: ('rfw', o.milestone.rfw_id if o.milestone else None),
+}
+
+# the user a change to each table shows up in, users are serialized inside the rows of USER_LINKS
+VERSIONED_BY_USER = {
+    'user': lambda o: o.id,
+    'avatar': lambda o: o.user_id,
+    'social_media': lambda o: o.user_id,
+}
+
+# versioned table -> (table linking it to users, its id column there)
+USER_LINKS = {
+    'proposal': ('proposal_team', 'proposal_id'),
+    'rfw': ('rfw_worker', 'rfw_id'),
+}
+
+# parent column of child tables bulk updated outside the session, see bump_bulk
+PARENT_COLUMNS = {
+    'comment': ('proposal', 'proposal_id'),
+    'milestone': ('proposal', 'proposal_id'),
+}
+
+# when each list last lost a row, deletes leave nothing behind for max(date_updated) to see
+list_version = db.Table(
+    'list_version',
+    db.Model.metadata,
+    db.Column('name', db.String(255), primary_key=True),
+    db.Column('date_updated', db.DateTime, nullable=False),
+)
+
+
+def user_linked_ids(connection, user_ids):
+    # {versioned table: ids} of the rows serializing any of `user_ids`
+    changed = defaultdict(set)
+    for name, (link_name, column) in USER_LINKS.items():
+        link = db.metadata.tables[link_name]
+        rows = connection.execute(
+            select([link.c[column]]).where(link.c.user_id.in_(user_ids)).distinct()
+        )
+        changed[name].update(id for (id,) in rows if id is not None)
+    return changed
+
+
+def apply_bumps(connection, changed: dict):
+    now = datetime.now()
+    for name, ids in changed.items():
+        if not ids:
+            continue
+        table = db.metadata.tables[name]
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_(ids))
+            .values(version=table.c.version + 1, date_updated=now)
+        )
+
+
+def stamp_lists(connection, names):
+    now = datetime.now()
+    for name in names:
+        stamped = connection.execute(
+            list_version.update().where(list_version.c.name == name).values(date_updated=now)
+        ).rowcount
+        if not stamped:
+            connection.execute(list_version.insert().values(name=name, date_updated=now))
+
+
+def is_changed(session, obj):
+    return obj not in session.dirty or session.is_modified(obj)
+
+
+@event.listens_for(db.session, 'before_flush')
+def collect_user_versions(session, flush_context, instances):
+    # links are read before the flush, a deleted user's team & worker rows go with it
+    user_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        versioned_by = VERSIONED_BY_USER.get(getattr(obj, '__tablename__', None))
+        if versioned_by and is_changed(session, obj) and versioned_by(obj) is not None:
+            user_ids.add(versioned_by(obj))
+    if user_ids:
+        linked = session.info.setdefault('user_versions', defaultdict(set))
+        for name, ids in user_linked_ids(session.connection(), user_ids).items():
+            linked[name].update(ids)
+
+
+@event.listens_for(db.session, 'after_flush')
+def bump_versions(session, flush_context):
+    changed = session.info.pop('user_versions', None) or defaultdict(set)
+    deleted_lists = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        name = getattr(obj, '__tablename__', None)
+        versioned_by = VERSIONED_BY.get(name)
+        if not versioned_by or not is_changed(session, obj):
+            continue
+        table, id = versioned_by(obj)
+        if id is not None:
+            changed[table].add(id)
+        if obj in session.deleted and table == name:
+            deleted_lists.add(name)
+    apply_bumps(session.connection(), changed)
+    stamp_lists(session.connection(), deleted_lists)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_user_versions(session):
+    session.info.pop('user_versions', None)
+
+
+def bump_bulk(table: str, ids):
+    """
+    Version the rows a bulk UPDATE of `ids` in `table` shows up in, those
+    statements skip the flush so bump_versions never sees them.
+    """
+    connection = db.session.connection()
+    if table in VERSIONED_TABLES:
+        changed = {table: set(ids)}
+    elif table in PARENT_COLUMNS:
+        parent, column = PARENT_COLUMNS[table]
+        child = db.metadata.tables[table]
+        rows = connection.execute(select([child.c[column]]).where(child.c.id.in_(ids)).distinct())
+        changed = {parent: {id for (id,) in rows if id is not None}}
+    elif table == 'user':
+        changed = user_linked_ids(connection, ids)
+    else:
+        return
+    apply_bumps(connection, changed)
+
+
+def make_etag(table: str, id, version: int):
+    # keyed with the secret so ids & versions of hidden entities can't be probed
+    raw = f'{current_app.config["SECRET_KEY"]}:{table}:{id}:{version}:{auth_scope()}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def not_modified(**headers):
+    response = current_app.response_class(status=304)
+    for k, v in headers.items():
+        setattr(response, k, v)
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional_get(model, id_arg: str):
+    """
+    Answer If-None-Match for a detail view with a strong ETag built from the
+    model's version column, without loading or serializing the entity.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            version = db.session.query(model.version).filter(model.id == kwargs[id_arg]).scalar()
+            if version is None:
+                return f(*args, **kwargs)
+            etag = make_etag(model.__tablename__, kwargs[id_arg], version)
+            if etag in request.if_none_match:
+                response = not_modified()
+                response.set_etag(etag)
+                return response
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.add('Cookie')
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def last_modified(model):
+    """
+    Answer If-Modified-Since for a list view with the latest date_updated of
+    `model`, or when a row was last deleted from it. Any change to any row
+    counts as a change to the list. Lists changed in the current second get
+    no Last-Modified, as a later write in that second would share its date.
+    """
+    deleted = select([list_version.c.date_updated]) \
+        .where(list_version.c.name == model.__tablename__) \
+        .as_scalar()
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            updated, deleted_at = db.session.query(func.max(model.date_updated), deleted).one()
+            modified = max((d for d in (updated, deleted_at) if d is not None), default=None)
+            if modified is None:
+                return f(*args, **kwargs)
+            # http dates have second precision, round up so the date is never before a write
+            if modified.microsecond:
+                modified = modified.replace(microsecond=0) + timedelta(seconds=1)
+            # until that second is over another write could land in it with the same date
+            if modified > datetime.now():
+                return f(*args, **kwargs)
+            since = request.if_modified_since
+            if since and modified <= since.replace(tzinfo=None):
+                return not_modified(last_modified=modified)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.last_modified = modified
+                response.vary.add('Cookie')
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,85 @@
+import hashlib
+import hmac
+import random
+import threading
+from collections import defaultdict, deque
+
+from sqlalchemy import select
+
+from grant.extensions import db
+from grant.settings import PUBLIC_ID_KEY
+
+MIN_ID = 100000
+MAX_ID = pow(2, 31) - 1
+ID_SPACE = MAX_ID - MIN_ID + 1
+BLOCK_SIZE = 100
+FEISTEL_ROUNDS = 4
+
+# each value handed out by this sequence reserves BLOCK_SIZE consecutive counters
+public_id_block_seq = db.Sequence('public_id_block_seq', metadata=db.Model.metadata)
+
+
+def _round(key: bytes, index: int, half: int):
+    digest = hmac.new(key, bytes([index]) + half.to_bytes(2, 'big'), hashlib.sha256).digest()
+    return int.from_bytes(digest[:2], 'big')
+
+
+def _feistel(value: int, key: bytes):
+    left, right = value >> 16, value & 0xFFFF
+    for i in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _round(key, i, right)
+    return (left << 16) | right
+
+
+def permute(counter: int, key: bytes):
+    """
+    Map a counter onto [MIN_ID, MAX_ID] with a keyed permutation, so consecutive
+    counters give unrelated looking ids that can never collide with each other.
+    """
+    if not 0 <= counter < ID_SPACE:
+        raise ValueError(f'Public id counter {counter} is out of range')
+    value = _feistel(counter, key)
+    # cycle walk until we land back inside the id space
+    while value >= ID_SPACE:
+        value = _feistel(value, key)
+    return value + MIN_ID
+
+
+class PublicIdAllocator:
+    """
+    Hands out non-sequential public ids with one round-trip per BLOCK_SIZE ids.
+    Counters are reserved in blocks from a database sequence, databases without
+    sequences (sqlite in dev and tests) pick random unused blocks instead. Rows
+    from before permuted ids have random ids, so each block is checked against
+    the model's table once and ids already taken there are skipped.
+    """
+
+    def __init__(self, key: str):
+        self.key = key.encode()
+        self.lock = threading.Lock()
+        # model -> ids left from its reserved blocks
+        self.pending = defaultdict(deque)
+        self.used_blocks = set()
+
+    def reserve_block(self, model):
+        if db.engine.dialect.supports_sequences:
+            block = db.session.execute(select([public_id_block_seq.next_value()])).scalar()
+        else:
+            block = random.randrange(ID_SPACE // BLOCK_SIZE)
+            while block in self.used_blocks:
+                block = random.randrange(ID_SPACE // BLOCK_SIZE)
+        self.used_blocks.add(block)
+        ids = [permute(counter, self.key) for counter in range(block * BLOCK_SIZE, (block + 1) * BLOCK_SIZE)]
+        # ids are generated while models are being built, don't flush them half done
+        with db.session.no_autoflush:
+            taken = {id for (id,) in db.session.query(model.id).filter(model.id.in_(ids))}
+        self.pending[model].extend(id for id in ids if id not in taken)
+
+    def next_id(self, model):
+        with self.lock:
+            while not self.pending[model]:
+                self.reserve_block(model)
+            return self.pending[model].popleft()
+
+
+public_ids = PublicIdAllocator(PUBLIC_ID_KEY)
@@ -0,0 +1,96 @@
+import json
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# longest statement text kept for the slowest query log line
+STATEMENT_LOG_LENGTH = 500
+
+
+class QueryStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self, total_ms: float):
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.count} queries"',
+            f'db-slowest;dur={self.slowest_seconds * 1000:.1f}',
+            f'app;dur={total_ms - self.db_seconds * 1000:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+
+def current_stats():
+    if has_request_context():
+        return g.get('query_stats')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_query(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = conn.info.get('query_started')
+    if stats is None or not started:
+        return
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+def init_app(app):
+    """
+    Opt-in per request query count and DB time (INSTRUMENTATION_ENABLED), sent as
+    Server-Timing headers and one JSON log line per request. Requests running more
+    than QUERY_BUDGET queries are logged as warnings, which flags N+1 endpoints.
+    """
+
+    @app.before_request
+    def start_instrumentation():
+        if current_app.config.get('INSTRUMENTATION_ENABLED'):
+            g.query_stats = QueryStats()
+
+    @app.after_request
+    def finish_instrumentation(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        budget = current_app.config['QUERY_BUDGET']
+        over_budget = stats.count > budget
+        response.headers['Server-Timing'] = stats.server_timing(total_ms)
+        line = json.dumps({
+            'event': 'request_queries',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats.count,
+            'query_budget': budget,
+            'over_budget': over_budget,
+            'db_ms': round(stats.db_seconds * 1000, 1),
+            'total_ms': round(total_ms, 1),
+            'slowest_ms': round(stats.slowest_seconds * 1000, 1),
+            'slowest_statement': (stats.slowest_statement or '')[:STATEMENT_LOG_LENGTH],
+        })
+        if over_budget:
+            app.logger.warning(line)
+        else:
+            app.logger.info(line)
+        return response
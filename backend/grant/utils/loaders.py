@@ -0,0 +1,56 @@
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+# nested schemas deeper than this are left to lazy loading
+MAX_LOADER_DEPTH = 4
+
+STRATEGIES = {
+    'selectinload': selectinload,
+    'joinedload': joinedload,
+}
+
+
+def loader_paths(model, schema, depth=0):
+    """
+    Walk the fields `schema` will dump and return the relationship paths of `model` they touch.
+    Each path is a list of (strategy name, attribute) tuples, starting at `model`.
+    Fields that read a relationship indirectly (hybrids, methods) can be mapped to it
+    with a LOADER_HINTS dict of {field name: relationship name} on the schema class,
+    e.g. {"current_milestone": "milestones"} eager loads milestones for current_milestone.
+    """
+    if depth >= MAX_LOADER_DEPTH:
+        return []
+    relationships = inspect(model).relationships
+    hints = getattr(schema, 'LOADER_HINTS', {})
+    paths = []
+    for name, field in schema.fields.items():
+        rel_name = hints.get(name, name)
+        if rel_name not in relationships:
+            continue
+        rel = relationships[rel_name]
+        strategy = 'selectinload' if rel.uselist else 'joinedload'
+        attr = getattr(model, rel_name)
+        paths.append([(strategy, attr)])
+        if isinstance(field, fields.Nested) and rel_name == name:
+            for sub_path in loader_paths(rel.mapper.class_, field.schema, depth + 1):
+                paths.append([(strategy, attr)] + sub_path)
+    return paths
+
+
+def make_option(path):
+    strategy, attr = path[0]
+    option = STRATEGIES[strategy](attr)
+    for strategy, attr in path[1:]:
+        option = getattr(option, strategy)(attr)
+    return option
+
+
+def loader_options(model, schema):
+    """Eager loader options matching the relations `schema` serializes for `model`."""
+    options = {}
+    for path in loader_paths(model, schema):
+        # several fields can hint at the same relationship
+        key = tuple((strategy, attr.key) for strategy, attr in path)
+        options.setdefault(key, path)
+    return [make_option(path) for path in options.values()]
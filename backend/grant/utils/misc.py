@@ -5,6 +5,7 @@ import string
 import time
 
 from grant.settings import SITE_URL, ADMIN_SITE_URL
+from grant.utils.ids import public_ids
 
 epoch = datetime.datetime.utcfromtimestamp(0)
 RANDOM_CHARS = string.ascii_letters + string.digits
@@ -71,16 +72,8 @@ def make_preview(content: str, max_length: int):
 
 
 def gen_random_id(model):
-    min_id = 100000
-    max_id = pow(2, 31) - 1
-    random_id = random.randint(min_id, max_id)
-
-    # If it already exists, generate a new one (recursively)
-    existing = model.query.filter_by(id=random_id).first()
-    if existing:
-        random_id = gen_random_id(model)
-
-    return random_id
+    # checked against model once per block of ids (see grant.utils.ids)
+    return public_ids.next_id(model)
 
 def clean_decimal(num):
     return '{0:.2f}'.format(num).rstrip('0').rstrip('.')
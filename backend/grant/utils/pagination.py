@@ -1,14 +1,22 @@
 import abc
-from sqlalchemy import or_, and_
-
-from grant.comment.models import Comment, comments_schema
+import base64
+import datetime
+import json
+from sqlalchemy import or_, and_, func
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from grant.comment.models import Comment, comments_schema, load_threads
 from grant.proposal.models import db, ma, Proposal
-from grant.user.models import User, UserSettings, users_schema, AzimuthPoint
+from grant.user.models import User, users_schema
 from grant.milestone.models import Milestone
 from grant.rfw.models import RFW, RFWWorker, RFWMilestone, RFWMilestoneClaim, rfw_schemas
 from grant.history.models import HistoryEvent, history_events_schema
 from grant.admin.models import AdminLog, admin_logs_schema
 from grant.tag.models import Tag, TagAssociation
+from .loaders import loader_options
+from .search import search_condition, user_search
+from .serializers import dump
 from .enums import (
     ProposalStatus,
     ProposalStage,
@@ -28,20 +36,162 @@ class PaginationException(Exception):
     pass
 
 
+CURSOR_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# stand-ins for NULL sort values in cursor mode, so keyset comparisons work
+# the same on every database (NULLs sort as the smallest value)
+CURSOR_NULL_FILLS = {
+    datetime.datetime: datetime.datetime(1970, 1, 1),
+    str: '',
+}
+
+
+# orders search results by rank, only valid alongside a search
+RELEVANCE_SORT = 'RELEVANCE'
+
+
 class Pagination(abc.ABC):
+    # filter prefix -> condition on the integer after it, ex: BOUNTY_MIN_100
+    RANGE_FILTERS = {}
+
     def validate_filters(self, filters: list):
         if self.FILTERS:
             for f in filters:
-                if 'TAG_' in f:
+                if 'TAG_' in f or f.startswith(tuple(self.RANGE_FILTERS)):
                     continue
                 if f not in self.FILTERS:
                     self._raise(f'unsupported filter: {f}')
 
     def validate_sort(self, sort: str):
         if self.SORT_MAP:
-            if sort not in self.SORT_MAP:
+            if sort not in self.SORT_MAP and sort != RELEVANCE_SORT:
                 self._raise(f'unsupported sort: {sort}')
 
+    def apply_sort(self, query, sort: str):
+        self.validate_sort(sort)
+        if sort == RELEVANCE_SORT:
+            # ordered by rank in apply_search
+            return query
+        return query.order_by(self.SORT_MAP[sort])
+
+    def apply_search(self, query, search: str, sort: str, *columns, extra=()):
+        """
+        Filter `query` to rows whose `columns` match `search` (see utils.search),
+        or any of the `extra` conditions, ordering by rank for RELEVANCE sorts.
+        """
+        condition, rank = search_condition(search, *columns)
+        return self.apply_ranked(query, sort, or_(condition, *extra), rank)
+
+    def apply_ranked(self, query, sort: str, condition, rank):
+        query = query.filter(condition)
+        if sort == RELEVANCE_SORT:
+            query = query.order_by(rank.desc(), self.MODEL.id.desc())
+        return query
+
+    def apply_range_filters(self, query, filters: list):
+        for prefix, condition in self.RANGE_FILTERS.items():
+            for value in extract_filters(prefix, filters):
+                try:
+                    query = query.filter(condition(int(value)))
+                except ValueError:
+                    self._raise(f'unsupported filter: {prefix}{value}')
+        return query
+
+    def sort_key(self, sort: str):
+        # returns (sort column expression, is descending) for a SORT_MAP entry
+        order = self.SORT_MAP[sort]
+        if isinstance(order, UnaryExpression):
+            return order.element, order.modifier == operators.desc_op
+        return order.__clause_element__(), False
+
+    def cursor_column(self, column):
+        python_type = column.type.python_type
+        if column.nullable and python_type in CURSOR_NULL_FILLS:
+            return func.coalesce(column, CURSOR_NULL_FILLS[python_type]), python_type
+        return column, python_type
+
+    def encode_cursor(self, value, id: int):
+        if isinstance(value, datetime.datetime):
+            value = value.strftime(CURSOR_DATE_FORMAT)
+        raw = json.dumps([value, id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor: str, python_type):
+        try:
+            value, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if python_type == datetime.datetime:
+                value = datetime.datetime.strptime(value, CURSOR_DATE_FORMAT)
+            return value, int(id)
+        except (ValueError, TypeError):
+            self._raise(f'invalid cursor: {cursor}')
+
+    def fetch_page(self, schema, query, page, cursor, filters, search, sort, prepare=None):
+        # prepare(items) runs on the fetched page before dumping, for bulk loading
+        if sort == RELEVANCE_SORT:
+            if not search:
+                self._raise(f'{RELEVANCE_SORT} sort requires a search')
+            if cursor is not None:
+                self._raise(f'{RELEVANCE_SORT} sort does not support cursors')
+
+        # cursor mode is opt-in, an empty cursor requests the first page
+        if cursor is None:
+            res = query.paginate(page, self.PAGE_SIZE, False)
+            if prepare:
+                prepare(res.items)
+            return {
+                'page': res.page,
+                'total': res.total,
+                'page_size': self.PAGE_SIZE,
+                'items': dump(schema, res.items),
+                'filters': filters,
+                'search': search,
+                'sort': sort
+            }
+
+        # keyset pagination on (sort column, id) so deep pages cost the same as the first,
+        # the total is only counted for the first page
+        column, is_desc = self.sort_key(sort)
+        key, python_type = self.cursor_column(column)
+        id_col = self.MODEL.id
+        total = None
+        if cursor:
+            value, last_id = self.decode_cursor(cursor, python_type)
+            if is_desc:
+                query = query.filter(or_(key < value, and_(key == value, id_col < last_id)))
+            else:
+                query = query.filter(or_(key > value, and_(key == value, id_col > last_id)))
+        else:
+            total = query.order_by(None).count()
+
+        if is_desc:
+            query = query.order_by(None).order_by(key.desc(), id_col.desc())
+        else:
+            query = query.order_by(None).order_by(key, id_col)
+
+        items = query.limit(self.PAGE_SIZE + 1).all()
+        next_cursor = None
+        if len(items) > self.PAGE_SIZE:
+            items = items[:self.PAGE_SIZE]
+            last = items[-1]
+            last_value = getattr(last, column.key)
+            if last_value is None:
+                last_value = CURSOR_NULL_FILLS[python_type]
+            next_cursor = self.encode_cursor(last_value, last.id)
+        if prepare:
+            prepare(items)
+
+        return {
+            'page': None,
+            'total': total,
+            'page_size': self.PAGE_SIZE,
+            'items': dump(schema, items),
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+            'filters': filters,
+            'search': search,
+            'sort': sort
+        }
+
     def _raise(self, desc: str):
         name = self.__class__.__name__
         raise PaginationException(f'{name} {desc}')
@@ -57,12 +207,14 @@ class Pagination(abc.ABC):
         filters: list,
         search: str,
         sort: str,
+        cursor: str,
     ):
         pass
 
 
 class ProposalPagination(Pagination):
     def __init__(self):
+        self.MODEL = Proposal
         self.FILTERS = [f'STATUS_{s}' for s in ProposalStatus.list()]
         self.FILTERS.extend([f'STAGE_{s}' for s in ProposalStage.list()])
         self.FILTERS.extend([f'CAT_{c}' for c in Category.list()])
@@ -75,6 +227,24 @@ class ProposalPagination(Pagination):
             'PUBLISHED:ASC': Proposal.date_published,  # OLDEST
         }
 
+    def apply_filters(self, query, filters: list):
+        self.validate_filters(filters)
+        status_filters = extract_filters('STATUS_', filters)
+        stage_filters = extract_filters('STAGE_', filters)
+        cat_filters = extract_filters('CAT_', filters)
+        milestone_filters = extract_filters('MILESTONE_', filters)
+
+        if status_filters:
+            query = query.filter(Proposal.status.in_(status_filters))
+        if stage_filters:
+            query = query.filter(Proposal.stage.in_(stage_filters))
+        if cat_filters:
+            query = query.filter(Proposal.category.in_(cat_filters))
+        if milestone_filters:
+            query = query.join(Proposal.milestones) \
+                .filter(Milestone.stage.in_(milestone_filters))
+        return query
+
     def paginate(
         self,
         schema: ma.Schema,
@@ -83,51 +253,32 @@ class ProposalPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='PUBLISHED:DESC',
+        cursor: str=None,
     ):
         query = query or Proposal.query
         sort = sort or 'PUBLISHED:DESC'
 
+        # eager load the relations the schema will dump instead of lazy loading per row
+        query = query.options(*loader_options(Proposal, schema))
+
         # FILTER
         if filters:
-            self.validate_filters(filters)
-            status_filters = extract_filters('STATUS_', filters)
-            stage_filters = extract_filters('STAGE_', filters)
-            cat_filters = extract_filters('CAT_', filters)
-            milestone_filters = extract_filters('MILESTONE_', filters)
-
-            if status_filters:
-                query = query.filter(Proposal.status.in_(status_filters))
-            if stage_filters:
-                query = query.filter(Proposal.stage.in_(stage_filters))
-            if cat_filters:
-                query = query.filter(Proposal.category.in_(cat_filters))
-            if milestone_filters:
-                query = query.join(Proposal.milestones) \
-                    .filter(Milestone.stage.in_(milestone_filters))
+            query = self.apply_filters(query, filters)
 
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.filter(Proposal.title.ilike(f'%{search}%'))
+            query = self.apply_search(query, search, sort, Proposal.title)
 
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort)
 
 
 class UserPagination(Pagination):
     def __init__(self):
+        self.MODEL = User
         self.FILTERS = ['BANNED', 'SILENCED']
         self.PAGE_SIZE = 9
         self.SORT_MAP = {
@@ -137,6 +288,14 @@ class UserPagination(Pagination):
             'NAME:ASC': User.display_name,
         }
 
+    def apply_filters(self, query, filters: list):
+        self.validate_filters(filters)
+        if 'BANNED' in filters:
+            query = query.filter(User.banned == True)
+        if 'SILENCED' in filters:
+            query = query.filter(User.silenced == True)
+        return query
+
     def paginate(
         self,
         schema: ma.Schema=users_schema,
@@ -145,46 +304,29 @@ class UserPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='EMAIL:DESC',
+        cursor: str=None,
     ):
-        query = query or Proposal.query
+        query = query or User.query
         sort = sort or 'EMAIL:DESC'
 
         # FILTER
         if filters:
-            self.validate_filters(filters)
-            if 'BANNED' in filters:
-                query = query.filter(User.banned == True)
-            if 'SILENCED' in filters:
-                query = query.filter(User.silenced == True)
+            query = self.apply_filters(query, filters)
 
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.join(AzimuthPoint) \
-                .filter(
-                    User.email_address.ilike(f'%{search}%') |
-                    User.display_name.ilike(f'%{search}%') |
-                    AzimuthPoint.point.ilike(f'%{search}%')
-                )
-
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+            query = self.apply_ranked(query, sort, *user_search(search))
+
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort)
 
 
 class CommentPagination(Pagination):
     def __init__(self):
+        self.MODEL = Comment
         self.FILTERS = ['REPORTED', 'HIDDEN']
         self.PAGE_SIZE = 10
         self.SORT_MAP = {
@@ -192,6 +334,14 @@ class CommentPagination(Pagination):
             'CREATED:ASC': Comment.date_created,
         }
 
+    def apply_filters(self, query, filters: list):
+        self.validate_filters(filters)
+        if 'REPORTED' in filters:
+            query = query.filter(Comment.reported == True)
+        if 'HIDDEN' in filters:
+            query = query.filter(Comment.hidden == True)
+        return query
+
     def paginate(
         self,
         schema: ma.Schema=comments_schema,
@@ -200,43 +350,32 @@ class CommentPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='CREATED:DESC',
+        cursor: str=None,
+        threads: bool=False,
     ):
         query = query or Comment.query
         sort = sort or 'CREATED:DESC'
 
         # FILTER
         if filters:
-            self.validate_filters(filters)
-            if 'REPORTED' in filters:
-                query = query.filter(Comment.reported == True)
-            if 'HIDDEN' in filters:
-                query = query.filter(Comment.hidden == True)
+            query = self.apply_filters(query, filters)
 
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.filter(
-                Comment.content.ilike(f'%{search}%')
-            )
+            query = self.apply_search(query, search, sort, Comment.content)
 
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+        # threads loads each comment's whole reply tree in one query
+        prepare = (lambda items: load_threads(items, schema)) if threads else None
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort, prepare=prepare)
 
 
 class RFWPagination(Pagination):
     def __init__(self):
+        self.MODEL = RFW
         self.FILTERS = ['WORKERS', 'CLAIMS']
         self.FILTERS.extend([f'STATUS_{s}' for s in RFWStatus.list()])
         self.FILTERS.extend([f'CAT_{c}' for c in Category.list()])
@@ -246,6 +385,17 @@ class RFWPagination(Pagination):
             'CREATED:ASC': RFW.date_created,
             'NEWEST': RFW.date_created.desc(),
             'OLDEST': RFW.date_created,
+            'BOUNTY:DESC': RFW.bounty.desc(),
+            'BOUNTY:ASC': RFW.bounty,
+            'EFFORT:DESC': RFW.effort_to.desc(),
+            'EFFORT:ASC': RFW.effort_from,
+        }
+        self.RANGE_FILTERS = {
+            'BOUNTY_MIN_': lambda v: RFW.bounty >= v,
+            'BOUNTY_MAX_': lambda v: RFW.bounty <= v,
+            # effort is itself a range, these keep rfws overlapping the requested one
+            'EFFORT_MIN_': lambda v: RFW.effort_to >= v,
+            'EFFORT_MAX_': lambda v: RFW.effort_from <= v,
         }
 
     def paginate(
@@ -256,10 +406,14 @@ class RFWPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='CREATED:DESC',
+        cursor: str=None,
     ):
         query = query or RFW.query
         sort = sort or 'CREATED:DESC'
 
+        # eager load the whole graph the schema will dump instead of lazy loading per row
+        query = query.options(*RFW.graph_options(schema))
+
         # FILTER
         if filters:
             self.validate_filters(filters)
@@ -281,32 +435,22 @@ class RFWPagination(Pagination):
                 query = query.join(RFWMilestone) \
                     .join(RFWMilestoneClaim) \
                     .filter(RFWMilestoneClaim.stage == RFWMilestoneClaimStage.REQUESTED)
+            query = self.apply_range_filters(query, filters)
 
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.filter(
-                RFW.title.ilike(f'%{search}%')
-            )
+            query = self.apply_search(query, search, sort, RFW.title)
 
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort)
 
 
 class HistoryPagination(Pagination):
     def __init__(self):
+        self.MODEL = HistoryEvent
         self.PAGE_SIZE = 10
         self.SORT_MAP = {
             'DATE:DESC': HistoryEvent.date.desc(),
@@ -321,36 +465,25 @@ class HistoryPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='DATE:DESC',
+        cursor: str=None,
     ):
         query = query or HistoryEvent.query
         sort = sort or 'DATE:DESC'
 
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.filter(
-                HistoryEvent.title.ilike(f'%{search}%') |
-                HistoryEvent.content.ilike(f'%{search}%')
-            )
+            query = self.apply_search(query, search, sort, HistoryEvent.title, HistoryEvent.content)
 
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort)
 
 
 class AdminLogPagination(Pagination):
     def __init__(self):
+        self.MODEL = AdminLog
         self.PAGE_SIZE = 30
         self.SORT_MAP = {
             'DATE:DESC': AdminLog.date_created.desc(),
@@ -365,37 +498,27 @@ class AdminLogPagination(Pagination):
         filters: list=None,
         search: str=None,
         sort: str='DATE:DESC',
+        cursor: str=None,
     ):
         query = query or AdminLog.query
         sort = sort or 'DATE:DESC'
 
+        query = query.options(*loader_options(AdminLog, schema))
+
         # SORT (see self.SORT_MAP)
         if sort:
-            self.validate_sort(sort)
-            query = query.order_by(self.SORT_MAP[sort])
+            query = self.apply_sort(query, sort)
 
         # SEARCH
         if search:
-            query = query.join(AdminLog.user) \
-                .filter(or_(
-                    AdminLog.event == search,
-                    AdminLog.ip.ilike(f'%{search}%'),
-                    AdminLog.message.ilike(f'%{search}%'),
-                    User.display_name.ilike(f'%{search}%'),
-                    User.email_address.ilike(f'%{search}%'),
-                ))
-            
-
-        res = query.paginate(page, self.PAGE_SIZE, False)
-        return {
-            'page': res.page,
-            'total': res.total,
-            'page_size': self.PAGE_SIZE,
-            'items': schema.dump(res.items),
-            'filters': filters,
-            'search': search,
-            'sort': sort
-        }
+            query = self.apply_search(query.join(AdminLog.user), search, sort, AdminLog.message, extra=(
+                AdminLog.event == search,
+                AdminLog.ip.ilike(f'%{search}%'),
+                User.display_name.ilike(f'%{search}%'),
+                User.email_address.ilike(f'%{search}%'),
+            ))
+
+        return self.fetch_page(schema, query, page, cursor, filters, search, sort)
 
 
 # expose pagination methods here
@@ -405,3 +528,8 @@ user = UserPagination().paginate
 rfw = RFWPagination().paginate
 history = HistoryPagination().paginate
 admin_log = AdminLogPagination().paginate
+
+# and the filters alone, for selecting the rows a bulk admin action applies to
+proposal_filters = ProposalPagination().apply_filters
+user_filters = UserPagination().apply_filters
+comment_filters = CommentPagination().apply_filters
@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+from animal_case import to_camel_case, to_snake_case
+
+from grant.utils.exceptions import ValidationException
+
+
+def invalid_fields(names: tuple):
+    # responses are camelCased, so errors name fields the way clients see them
+    return ValidationException(f'Invalid fields: {", ".join(to_camel_case(n) for n in names)}')
+
+
+@lru_cache(maxsize=256)
+def schema_variant(schema, only: tuple, exclude: tuple):
+    # variants keep the base schema's own projection, a request can only narrow it
+    if schema.only and only and not {f.split('.')[0] for f in only} <= set(schema.only):
+        raise invalid_fields(only)
+    try:
+        return type(schema)(
+            many=schema.many,
+            only=only or schema.only,
+            exclude=set(exclude) | set(schema.exclude),
+        )
+    except ValueError:
+        raise invalid_fields(only + exclude)
+
+
+def project(schema, fields: list = None, exclude: list = None):
+    """
+    Return `schema` narrowed to the requested sparse fieldset (see
+    parser.projection_fields). Names may be camelCase like the responses.
+    Variants are cached per projection, and since utils.loaders walks the
+    dumped fields the eager loads shrink with them.
+    """
+    if not fields and not exclude:
+        return schema
+    return schema_variant(
+        schema,
+        tuple(sorted(to_snake_case(f) for f in fields or ())),
+        tuple(sorted(to_snake_case(f) for f in exclude or ())),
+    )
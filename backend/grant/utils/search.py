@@ -0,0 +1,74 @@
+import re
+
+from sqlalchemy import func, literal, literal_column, or_
+
+from grant.extensions import db
+
+# constants are inlined rather than bound so queries match the index expressions
+# in the full-text search migration (see migrations/versions/d2c5e8f1a4b7_.py)
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+EMPTY = literal_column("''")
+SPACE = literal_column("' '")
+
+# searches made only of terms shorter than this use trigram word similarity,
+# tsquery prefixes that short match nearly every document
+FTS_MIN_TERM_LENGTH = 3
+
+
+def search_terms(search: str):
+    return re.findall(r'\w+', search.lower())
+
+
+def search_document(*columns):
+    """The tsvector of `columns`, must stay in sync with the GIN index expressions."""
+    document = func.coalesce(columns[0], EMPTY)
+    for column in columns[1:]:
+        document = document.concat(SPACE).concat(func.coalesce(column, EMPTY))
+    return func.to_tsvector(SEARCH_CONFIG, document)
+
+
+def prefix_query(terms: list):
+    # every term has to match, as a prefix so search-as-you-type works
+    return ' & '.join(f'{t}:*' for t in terms)
+
+
+def search_condition(search: str, *columns):
+    """
+    Return (filter condition, rank expression) matching `search` against `columns`.
+    Postgres uses the full-text GIN indexes, or the trigram indexes for short terms.
+    Other databases (sqlite in tests) fall back to substring matching with no rank.
+    """
+    terms = search_terms(search)
+    if db.engine.dialect.name != 'postgresql':
+        return or_(*[c.ilike(f'%{search}%') for c in columns]), literal(0)
+
+    if not terms or all(len(t) < FTS_MIN_TERM_LENGTH for t in terms):
+        condition = or_(*[literal(search).op('<%')(c) for c in columns])
+        rank = func.greatest(*[func.word_similarity(search, c) for c in columns])
+        return condition, rank
+
+    document = search_document(*columns)
+    query = func.to_tsquery(SEARCH_CONFIG, prefix_query(terms))
+    return document.op('@@')(query), func.ts_rank_cd(document, query)
+
+
+def user_search(search: str):
+    """
+    Return (filter condition, rank expression) for admin user search. Each of
+    email, display name and Azimuth point is looked up on its own trigram index
+    and the matching ids unioned, which also keeps users without a point.
+    """
+    from grant.user.models import User, AzimuthPoint
+    pattern = f'%{search}%'
+    ids = db.union(
+        db.select([User.id]).where(User.email_address.ilike(pattern)),
+        db.select([User.id]).where(User.display_name.ilike(pattern)),
+        db.select([AzimuthPoint.user_id]).where(AzimuthPoint.point.ilike(pattern)),
+    )
+    if db.engine.dialect.name != 'postgresql':
+        return User.id.in_(ids), literal(0)
+    rank = func.greatest(
+        func.word_similarity(search, User.email_address),
+        func.word_similarity(search, User.display_name),
+    )
+    return User.id.in_(ids), rank
@@ -0,0 +1,159 @@
+import threading
+
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+
+from grant.settings import FAST_SERIALIZERS
+
+# field classes whose dumped value is the attribute itself when it already has
+# one of these exact types, None means any type (the field doesn't format at all)
+PASSTHROUGH_TYPES = {
+    fields.Field: None,
+    fields.Raw: None,
+    fields.String: (str,),
+    fields.Integer: (int,),
+    fields.Float: (float,),
+    fields.Boolean: (bool,),
+}
+
+
+def is_compilable(schema):
+    # hooks and custom accessors can do anything, those schemas keep plain marshmallow
+    return (
+        not schema._has_processors(PRE_DUMP)
+        and not schema._has_processors(POST_DUMP)
+        and type(schema).get_attribute is Schema.get_attribute
+    )
+
+
+def is_plain_attribute(field, attr: str):
+    return (
+        field._CHECK_ATTRIBUTE
+        and '.' not in attr
+        and type(field).serialize is fields.Field.serialize
+        and type(field).get_value is fields.Field.get_value
+    )
+
+
+def compile_dump(schema):
+    """
+    Generate a function that dumps one object exactly like `schema.dump(obj, many=False)`,
+    from the schema's currently bound fields. Each field becomes a direct attribute
+    read, a bound method call or a call into the nested schema's compiled dumper,
+    anything else goes through the field's own serialize.
+    """
+    env = {'missing': missing, 'get_attribute': schema.get_attribute}
+    lines = ['def dump(obj):', '    d = {}']
+    for i, (name, field) in enumerate(schema.fields.items()):
+        if field.load_only:
+            continue
+        key = (schema.prefix or '') + (field.data_key or name)
+        attr = field.attribute or name
+        env[f'f{i}'] = field
+        fallback = f'f{i}.serialize({name!r}, obj, get_attribute)'
+
+        if type(field) is fields.Method:
+            if not field.serialize_method_name:
+                continue
+            env[f'm{i}'] = getattr(schema, field.serialize_method_name)
+            lines.append(f'    v = m{i}(obj)')
+        elif (
+            type(field) is fields.Nested
+            and not isinstance(field.only, str)
+            and is_compilable(field.schema)
+            and is_plain_attribute(field, attr)
+        ):
+            env[f'n{i}'] = dumper(field.schema).one
+            nested = f'[n{i}(x) for x in v]' if field.many else f'n{i}(v)'
+            lines += [
+                f'    v = getattr(obj, {attr!r}, missing)',
+                f'    if v is missing:',
+                f'        v = {fallback}',
+                f'    elif v is not None:',
+                f'        v = {nested}',
+            ]
+        elif is_plain_attribute(field, attr):
+            lines += [
+                f'    v = getattr(obj, {attr!r}, missing)',
+                f'    if v is missing:',
+                f'        v = {fallback}',
+            ]
+            passthrough = type(field) in PASSTHROUGH_TYPES and not getattr(field, 'as_string', False)
+            types = PASSTHROUGH_TYPES.get(type(field))
+            if not passthrough:
+                lines += [
+                    f'    else:',
+                    f'        v = f{i}._serialize(v, {name!r}, obj)',
+                ]
+            elif types is not None:
+                env[f't{i}'] = types
+                lines += [
+                    f'    elif v is not None and v.__class__ not in t{i}:',
+                    f'        v = f{i}._serialize(v, {name!r}, obj)',
+                ]
+        else:
+            lines.append(f'    v = {fallback}')
+        lines += [
+            f'    if v is not missing:',
+            f'        d[{key!r}] = v',
+        ]
+    lines.append('    return d')
+    exec('\n'.join(lines), env)
+    return env['dump']
+
+
+class CompiledDumper:
+    """
+    Compiled dump functions for one schema instance, one per type of object dumped.
+    Marshmallow binds fields inferred from `Meta.fields` on the first object of
+    each type it sees, so that first object goes through marshmallow and the
+    function is generated from the fields it bound.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.functions = {}
+        self.lock = threading.RLock()
+
+    def one(self, obj):
+        fn = self.functions.get(obj.__class__)
+        if fn is None:
+            return self.compile(obj)
+        return fn(obj)
+
+    def compile(self, obj):
+        # reentrant, a method field can dump nested objects with this same schema
+        with self.lock:
+            data = self.schema.dump(obj, many=False)
+            self.functions[obj.__class__] = compile_dump(self.schema)
+        return data
+
+    def many(self, objs):
+        one = self.one
+        return [one(obj) for obj in objs]
+
+
+def dumper(schema):
+    # kept on the schema instance so it lives exactly as long as the schema
+    compiled = schema.__dict__.get('_compiled_dumper')
+    if compiled is None:
+        compiled = schema.__dict__.setdefault('_compiled_dumper', CompiledDumper(schema))
+    return compiled
+
+
+def dump(schema, obj, many: bool = None):
+    """
+    Drop-in for `schema.dump(obj)` on hot paths. Uses the compiled dumper for
+    model objects, mappings and schemas with hooks keep plain marshmallow.
+    """
+    many = schema.many if many is None else many
+    if not FAST_SERIALIZERS or not is_compilable(schema):
+        return schema.dump(obj, many=many)
+    if many:
+        objs = list(obj)
+        if any(hasattr(o, '__getitem__') for o in objs):
+            return schema.dump(objs, many=True)
+        return dumper(schema).many(objs)
+    if hasattr(obj, '__getitem__'):
+        return schema.dump(obj, many=False)
+    return dumper(schema).one(obj)
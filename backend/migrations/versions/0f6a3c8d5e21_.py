@@ -0,0 +1,45 @@
+"""Email outbox
+
+Revision ID: 0f6a3c8d5e21
+Revises: b4d9e2a61c07
+Create Date: 2026-10-18 15:10:42.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f6a3c8d5e21'
+down_revision = 'b4d9e2a61c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.Column('to_address', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=255), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('send_after', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('claimed_until', sa.DateTime(), nullable=True),
+    sa.Column('dead', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_email_outbox_pending_send_after',
+        'email_outbox',
+        ['send_after'],
+        unique=False,
+        postgresql_where=sa.text('sent_at IS NULL AND NOT dead'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_pending_send_after', table_name='email_outbox')
+    op.drop_table('email_outbox')
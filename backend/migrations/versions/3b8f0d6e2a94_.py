@@ -0,0 +1,31 @@
+"""Proposal & RFW versions for conditional GETs
+
+Revision ID: 3b8f0d6e2a94
+Revises: 7a1e4b9c3d52
+Create Date: 2026-10-18 17:41:13.905528
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f0d6e2a94'
+down_revision = '7a1e4b9c3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ['proposal', 'rfw']:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+        op.add_column(table, sa.Column('date_updated', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET date_updated = date_created')
+        op.create_index(op.f(f'ix_{table}_date_updated'), table, ['date_updated'], unique=False)
+
+
+def downgrade():
+    for table in ['proposal', 'rfw']:
+        op.drop_index(op.f(f'ix_{table}_date_updated'), table_name=table)
+        op.drop_column(table, 'date_updated')
+        op.drop_column(table, 'version')
@@ -0,0 +1,38 @@
+"""Denormalized proposal follower & comment counts
+
+Revision ID: 5e8d20b7c1a9
+Revises: a3f1c9e27b54
+Create Date: 2026-10-18 11:03:47.915204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8d20b7c1a9'
+down_revision = 'a3f1c9e27b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('proposal', sa.Column('followers_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('proposal', sa.Column('comments_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # backfill, same as `flask reconcile-proposal-counts`
+    op.execute("""
+        UPDATE proposal SET
+            followers_count = (
+                SELECT count(proposal_follower.proposal_id) FROM proposal_follower
+                WHERE proposal_follower.proposal_id = proposal.id
+            ),
+            comments_count = (
+                SELECT count(comment.id) FROM comment
+                WHERE comment.proposal_id = proposal.id AND comment.hidden != true
+            )
+    """)
+
+
+def downgrade():
+    op.drop_column('proposal', 'comments_count')
+    op.drop_column('proposal', 'followers_count')
@@ -0,0 +1,48 @@
+"""Materialized comment path & depth
+
+Revision ID: 5e9a2c7b1d38
+Revises: 3b8f0d6e2a94
+Create Date: 2026-10-18 18:26:52.417306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9a2c7b1d38'
+down_revision = '3b8f0d6e2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('comment', sa.Column('path', sa.Text(), nullable=True))
+    op.add_column('comment', sa.Column('depth', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # must match grant.comment.models.path_segment
+    op.execute("""
+        WITH RECURSIVE tree(id, path, depth) AS (
+            SELECT id, lpad(id::text, 10, '0') || '/', 0
+            FROM comment
+            WHERE parent_comment_id IS NULL
+          UNION ALL
+            SELECT c.id, tree.path || lpad(c.id::text, 10, '0') || '/', tree.depth + 1
+            FROM comment c
+            JOIN tree ON c.parent_comment_id = tree.id
+        )
+        UPDATE comment
+        SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE comment.id = tree.id
+    """)
+    op.alter_column('comment', 'path', existing_type=sa.Text(), nullable=False)
+    op.create_index(
+        'ix_comment_path', 'comment', ['path'], unique=False,
+        postgresql_ops={'path': 'text_pattern_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_comment_path', table_name='comment')
+    op.drop_column('comment', 'depth')
+    op.drop_column('comment', 'path')
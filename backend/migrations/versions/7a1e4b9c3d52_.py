@@ -0,0 +1,28 @@
+"""User search trigram indexes
+
+Revision ID: 7a1e4b9c3d52
+Revises: d2c5e8f1a4b7
+Create Date: 2026-10-18 16:58:37.204911
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7a1e4b9c3d52'
+down_revision = 'd2c5e8f1a4b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is created by d2c5e8f1a4b7
+    op.execute('CREATE INDEX ix_user_email_address_trgm ON "user" USING gin (email_address gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_user_display_name_trgm ON "user" USING gin (display_name gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_azimuth_point_point_trgm ON azimuth_point USING gin (point gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX ix_azimuth_point_point_trgm')
+    op.execute('DROP INDEX ix_user_display_name_trgm')
+    op.execute('DROP INDEX ix_user_email_address_trgm')
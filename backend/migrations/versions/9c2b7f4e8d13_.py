@@ -0,0 +1,25 @@
+"""Public id block sequence
+
+Revision ID: 9c2b7f4e8d13
+Revises: 5e8d20b7c1a9
+Create Date: 2026-10-18 11:48:09.551372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import Sequence, CreateSequence, DropSequence
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2b7f4e8d13'
+down_revision = '5e8d20b7c1a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(CreateSequence(Sequence('public_id_block_seq')))
+
+
+def downgrade():
+    op.execute(DropSequence(Sequence('public_id_block_seq')))
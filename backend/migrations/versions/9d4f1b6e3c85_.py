@@ -0,0 +1,57 @@
+"""Index foreign keys
+
+Revision ID: 9d4f1b6e3c85
+Revises: 5e9a2c7b1d38
+Create Date: 2026-10-18 18:58:04.663190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b6e3c85'
+down_revision = '5e9a2c7b1d38'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns), matching the models, see tests/test_indexes.py
+INDEXES = [
+    ('ix_admin_log_user_id', 'admin_log', ['user_id']),
+    ('ix_roles_users_user_id_role_id', 'roles_users', ['user_id', 'role_id']),
+    ('ix_roles_users_role_id', 'roles_users', ['role_id']),
+    ('ix_social_media_user_id', 'social_media', ['user_id']),
+    ('ix_azimuth_point_user_id', 'azimuth_point', ['user_id']),
+    ('ix_user_settings_user_id', 'user_settings', ['user_id']),
+    ('ix_avatar_user_id', 'avatar', ['user_id']),
+    ('ix_history_event_proposal_id_date', 'history_event', ['proposal_id', 'date']),
+    ('ix_history_event_user_id', 'history_event', ['user_id']),
+    ('ix_milestone_proposal_id_index', 'milestone', ['proposal_id', 'index']),
+    ('ix_milestone_requested_user_id', 'milestone', ['requested_user_id']),
+    ('ix_rfw_milestone_claim_worker_id', 'rfw_milestone_claim', ['worker_id']),
+    ('ix_rfw_milestone_claim_milestone_id', 'rfw_milestone_claim', ['milestone_id']),
+    ('ix_rfw_milestone_rfw_id_index', 'rfw_milestone', ['rfw_id', 'index']),
+    ('ix_rfw_worker_user_id_status', 'rfw_worker', ['user_id', 'status']),
+    ('ix_rfw_worker_rfw_id', 'rfw_worker', ['rfw_id']),
+    ('ix_proposal_team_proposal_id_user_id', 'proposal_team', ['proposal_id', 'user_id']),
+    ('ix_proposal_team_user_id_proposal_id', 'proposal_team', ['user_id', 'proposal_id']),
+    ('ix_proposal_follower_proposal_id_user_id', 'proposal_follower', ['proposal_id', 'user_id']),
+    ('ix_proposal_team_invite_proposal_id', 'proposal_team_invite', ['proposal_id']),
+    ('ix_proposal_update_proposal_id', 'proposal_update', ['proposal_id']),
+    ('ix_proposal_rfp_id', 'proposal', ['rfp_id']),
+    ('ix_tag_association_rfw_id_tag_id', 'tag_association', ['rfw_id', 'tag_id']),
+    ('ix_tag_association_tag_id_rfw_id', 'tag_association', ['tag_id', 'rfw_id']),
+    ('ix_comment_proposal_id_parent_comment_id_hidden', 'comment', ['proposal_id', 'parent_comment_id', 'hidden']),
+    ('ix_comment_parent_comment_id', 'comment', ['parent_comment_id']),
+    ('ix_comment_user_id_date_created', 'comment', ['user_id', 'date_created']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,24 @@
+"""Index proposal_follower by user for authed follow lookups
+
+Revision ID: a3f1c9e27b54
+Revises: 6b89fae381cb
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9e27b54'
+down_revision = '6b89fae381cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_proposal_follower_user_id_proposal_id', 'proposal_follower', ['user_id', 'proposal_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_proposal_follower_user_id_proposal_id', table_name='proposal_follower')
@@ -0,0 +1,44 @@
+"""Pending task index & task archive
+
+Revision ID: b4d9e2a61c07
+Revises: e71d4a0b9f26
+Create Date: 2026-10-18 14:02:31.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d9e2a61c07'
+down_revision = 'e71d4a0b9f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_task_pending_execute_after',
+        'task',
+        ['execute_after'],
+        unique=False,
+        postgresql_where=sa.text('NOT completed'),
+    )
+    op.create_table('task_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('job_type', sa.Integer(), nullable=False),
+    sa.Column('blob', sa.Text(), nullable=False),
+    sa.Column('execute_after', sa.DateTime(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('claimed_until', sa.DateTime(), nullable=True),
+    sa.Column('dead', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('task_archive')
+    op.drop_index('ix_task_pending_execute_after', table_name='task')
@@ -0,0 +1,41 @@
+"""RFW bounty & effort rollup columns
+
+Revision ID: c8e3a5f2d016
+Revises: 9d4f1b6e3c85
+Create Date: 2026-10-18 19:34:47.120593
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e3a5f2d016'
+down_revision = '9d4f1b6e3c85'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['bounty', 'effort_from', 'effort_to']
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.add_column('rfw', sa.Column(column, sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE rfw
+        SET bounty = totals.bounty, effort_from = totals.effort_from, effort_to = totals.effort_to
+        FROM (
+            SELECT rfw_id, SUM(bounty) AS bounty, SUM(effort_from) AS effort_from, SUM(effort_to) AS effort_to
+            FROM rfw_milestone
+            GROUP BY rfw_id
+        ) AS totals
+        WHERE rfw.id = totals.rfw_id
+    """)
+    for column in COLUMNS:
+        op.create_index(op.f(f'ix_rfw_{column}'), 'rfw', [column], unique=False)
+
+
+def downgrade():
+    for column in COLUMNS:
+        op.drop_index(op.f(f'ix_rfw_{column}'), table_name='rfw')
+        op.drop_column('rfw', column)
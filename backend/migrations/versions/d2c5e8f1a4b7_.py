@@ -0,0 +1,47 @@
+"""Full-text & trigram search indexes
+
+Revision ID: d2c5e8f1a4b7
+Revises: 0f6a3c8d5e21
+Create Date: 2026-10-18 16:24:09.771352
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c5e8f1a4b7'
+down_revision = '0f6a3c8d5e21'
+branch_labels = None
+depends_on = None
+
+# (index, table, tsvector document), must match grant.utils.search.search_document
+FTS_INDEXES = [
+    ('ix_proposal_title_fts', 'proposal', "coalesce(title, '')"),
+    ('ix_rfw_title_fts', 'rfw', "coalesce(title, '')"),
+    ('ix_comment_content_fts', 'comment', "coalesce(content, '')"),
+    ('ix_history_event_fts', 'history_event', "coalesce(title, '') || ' ' || coalesce(content, '')"),
+    ('ix_admin_log_message_fts', 'admin_log', "coalesce(message, '')"),
+]
+
+# (index, table, column) used for short search terms
+TRGM_INDEXES = [
+    ('ix_proposal_title_trgm', 'proposal', 'title'),
+    ('ix_rfw_title_trgm', 'rfw', 'title'),
+    ('ix_comment_content_trgm', 'comment', 'content'),
+    ('ix_history_event_title_trgm', 'history_event', 'title'),
+    ('ix_history_event_content_trgm', 'history_event', 'content'),
+    ('ix_admin_log_message_trgm', 'admin_log', 'message'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, document in FTS_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {table} USING gin (to_tsvector('english'::regconfig, {document}))")
+    for name, table, column in TRGM_INDEXES:
+        op.execute(f'CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    for name, _, _ in TRGM_INDEXES + FTS_INDEXES:
+        op.execute(f'DROP INDEX {name}')
@@ -0,0 +1,23 @@
+"""admin_log (date_created, id) index for newest first paging
+
+Revision ID: e4b7c1d9a630
+Revises: c8e3a5f2d016
+Create Date: 2026-10-18 21:12:05.348216
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c1d9a630'
+down_revision = 'c8e3a5f2d016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_admin_log_date_created_id', 'admin_log', ['date_created', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_admin_log_date_created_id', table_name='admin_log')
@@ -0,0 +1,30 @@
+"""Task worker retries & dead-letter state
+
+Revision ID: e71d4a0b9f26
+Revises: 9c2b7f4e8d13
+Create Date: 2026-10-18 13:21:55.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71d4a0b9f26'
+down_revision = '9c2b7f4e8d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('task', sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('task', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('task', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+    op.add_column('task', sa.Column('dead', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False))
+
+
+def downgrade():
+    op.drop_column('task', 'dead')
+    op.drop_column('task', 'claimed_until')
+    op.drop_column('task', 'last_error')
+    op.drop_column('task', 'attempts')
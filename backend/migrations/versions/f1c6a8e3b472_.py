@@ -0,0 +1,29 @@
+"""list_version, when a row was last deleted from each list
+
+Revision ID: f1c6a8e3b472
+Revises: e4b7c1d9a630
+Create Date: 2026-10-18 22:03:41.518730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a8e3b472'
+down_revision = 'e4b7c1d9a630'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'list_version',
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('date_updated', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('list_version')
@@ -1,9 +1,12 @@
 import json
 from grant.utils.enums import ProposalStatus
 import grant.utils.admin as admin
+from grant.admin.models import AdminLog
+from grant.comment.models import Comment
+from grant.extensions import cache
 from grant.utils import totp_2fa
 from grant.user.models import admin_user_schema
-from grant.proposal.models import proposal_schema, db
+from grant.proposal.models import Proposal, proposal_schema, db
 from grant.tag import models as tag_models
 from mock import patch
 
@@ -203,6 +206,35 @@ class TestAdminAPI(BaseProposalCreatorConfig):
         # 2 users created by BaseProposalCreatorConfig
         self.assertEqual(len(resp.json['items']), 2)
 
+    def test_delete_following_user(self):
+        self.proposal.status = ProposalStatus.LIVE
+        self.proposal.follow(self.user, True)
+        self.proposal.follow(self.other_user, True)
+        db.session.commit()
+        proposal_id = self.proposal.id
+        self.login_admin()
+
+        resp = self.app.delete(f"/api/v1/admin/users/{self.other_user.id}")
+        self.assert200(resp)
+
+        resp = self.app.get(f"/api/v1/proposals/{proposal_id}")
+        self.assert200(resp)
+        db.session.expire_all()
+        followers = Proposal.query.get(proposal_id).followers
+        self.assertEqual([f.id for f in followers], [self.user.id])
+        self.assertEqual(resp.json["followersCount"], 1)
+
+    def test_search_users(self):
+        self.login_admin()
+        # neither default user has an azimuth point, both are still found
+        resp = self.app.get("/api/v1/admin/users", query_string={"search": self.other_user.email_address})
+        self.assert200(resp)
+        self.assertEqual([u['id'] for u in resp.json['items']], [self.other_user.id])
+
+        resp = self.app.get("/api/v1/admin/users", query_string={"search": "nobody-matches-this"})
+        self.assert200(resp)
+        self.assertEqual(resp.json['items'], [])
+
     def test_get_proposals(self):
         self.login_admin()
         resp = self.app.get("/api/v1/admin/proposals")
@@ -210,6 +242,142 @@ class TestAdminAPI(BaseProposalCreatorConfig):
         # 2 proposals created by BaseProposalCreatorConfig
         self.assertEqual(len(resp.json['items']), 2)
 
+    def test_get_stats(self):
+        self.login_admin()
+        with self.app.application.app_context():
+            cache.clear()
+        self.proposal.status = ProposalStatus.PENDING
+        db.session.commit()
+
+        resp = self.app.get("/api/v1/admin/stats")
+        self.assert200(resp)
+        self.assertEqual(resp.json["userCount"], 2)
+        self.assertEqual(resp.json["proposalCount"], 2)
+        self.assertEqual(resp.json["proposalPendingCount"], 1)
+        self.assertEqual(resp.json["proposalMilestonePayoutsCount"], 0)
+        weeks = resp.json["trends"]["proposalsPerWeek"]
+        self.assertEqual(len(weeks), 12)
+        self.assertEqual(weeks[-1]["count"], 2)
+        self.assertEqual(sum(m["count"] for m in resp.json["trends"]["payoutsPerMonth"]), 0)
+
+        # served from the cache until it expires
+        self.proposal.status = ProposalStatus.LIVE
+        db.session.commit()
+        resp = self.app.get("/api/v1/admin/stats")
+        self.assertEqual(resp.json["proposalPendingCount"], 1)
+
+    def test_admin_log_writes_on_commit(self):
+        with self.app.application.test_request_context(environ_base={"REMOTE_ADDR": "127.0.0.1"}):
+            before = AdminLog.query.count()
+            admin.admin_log("TEST", "rolled back")
+            db.session.rollback()
+            admin.admin_log("TEST", "first")
+            admin.admin_log("TEST", "second")
+            # queued on the session, nothing is written until commit
+            self.assertEqual(AdminLog.query.count(), before)
+            db.session.commit()
+            logs = AdminLog.query.filter_by(event="TEST").order_by(AdminLog.date_created).all()
+            self.assertEqual([log.message for log in logs], ["first", "second"])
+
+        self.login_admin()
+        resp = self.app.get("/api/v1/admin/logs")
+        self.assert200(resp)
+        messages = [x["message"] for x in resp.json["items"] if x["event"] == "TEST"]
+        self.assertEqual(messages, ["second", "first"])
+
+    def test_bulk_edit_comments(self):
+        comments = [Comment(self.proposal.id, self.other_user.id, None, f'spam {i}') for i in range(3)]
+        for c in comments[:2]:
+            c.report(True)
+        db.session.add_all(comments)
+        db.session.commit()
+        comment_ids = [c.id for c in comments]
+        self.assertEqual(self.proposal.comments_count, 3)
+        self.login_admin()
+
+        def fetch():
+            # the bulk UPDATEs skip the session, so read the rows fresh
+            db.session.expire_all()
+            return [Comment.query.get(id) for id in comment_ids], Proposal.query.get(self.proposal.id)
+
+        # nothing selected
+        resp = self.app.put("/api/v1/admin/comments", data=json.dumps({"hidden": True}))
+        self.assert400(resp)
+
+        resp = self.app.put("/api/v1/admin/comments", data=json.dumps({
+            "filters": ["REPORTED"],
+            "hidden": True,
+            "reported": False,
+        }))
+        self.assert200(resp)
+        self.assertEqual(resp.json["ids"], sorted(comment_ids[:2]))
+        comments, proposal = fetch()
+        self.assertEqual([c.hidden for c in comments], [True, True, False])
+        self.assertEqual([c.reported for c in comments], [False, False, False])
+        self.assertEqual(proposal.comments_count, 1)
+        logs = AdminLog.query.filter_by(event="COMMENT_BULK_MODERATE").all()
+        self.assertEqual(len(logs), 1)
+
+        # every flag applies to the rows selected up front, though un-hiding them
+        # means they no longer match the HIDDEN filter
+        resp = self.app.put("/api/v1/admin/comments", data=json.dumps({
+            "filters": ["HIDDEN"],
+            "hidden": False,
+            "reported": True,
+        }))
+        self.assert200(resp)
+        self.assertEqual(resp.json["ids"], sorted(comment_ids[:2]))
+        comments, proposal = fetch()
+        self.assertEqual([c.hidden for c in comments], [False, False, False])
+        self.assertEqual([c.reported for c in comments], [True, True, False])
+        self.assertEqual(proposal.comments_count, 3)
+
+        # rows already hidden aren't changed again
+        self.app.put("/api/v1/admin/comments", data=json.dumps({"ids": comment_ids[:1], "hidden": True}))
+        resp = self.app.put("/api/v1/admin/comments", data=json.dumps({
+            "ids": comment_ids,
+            "hidden": True,
+        }))
+        self.assertEqual(resp.json["ids"], sorted(comment_ids[1:]))
+        comments, proposal = fetch()
+        self.assertEqual(proposal.comments_count, 0)
+
+    def test_bulk_edit_users(self):
+        self.login_admin()
+        resp = self.app.put("/api/v1/admin/users", data=json.dumps({
+            "ids": [self.other_user.id],
+            "banned": True,
+        }))
+        self.assertEqual(resp.status_code, 417)
+
+        resp = self.app.put("/api/v1/admin/users", data=json.dumps({
+            "ids": [self.other_user.id],
+            "silenced": True,
+            "banned": True,
+            "bannedReason": "spam",
+        }))
+        self.assert200(resp)
+        self.assertEqual(resp.json["ids"], [self.other_user.id])
+        self.assertTrue(self.other_user.silenced)
+        self.assertTrue(self.other_user.banned)
+        self.assertEqual(self.other_user.banned_reason, "spam")
+        self.assertFalse(self.user.banned)
+
+        resp = self.app.put("/api/v1/admin/users", data=json.dumps({"filters": ["BAD"], "silenced": True}))
+        self.assert400(resp)
+
+        # banning the silenced users still applies after un-silencing them
+        resp = self.app.put("/api/v1/admin/users", data=json.dumps({
+            "filters": ["SILENCED"],
+            "silenced": False,
+            "banned": False,
+        }))
+        self.assert200(resp)
+        self.assertEqual(resp.json["ids"], [self.other_user.id])
+        db.session.expire_all()
+        self.assertFalse(self.other_user.silenced)
+        self.assertFalse(self.other_user.banned)
+
     # def test_update_proposal(self):
     #     pass
 
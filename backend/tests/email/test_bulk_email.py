@@ -0,0 +1,41 @@
+from grant.email.send import make_bulk_envelopes, UNSUBSCRIBE_URL_TOKEN
+from grant.extensions import db
+from grant.proposal.models import proposal_follower
+from grant.user.models import User
+
+from ..config import BaseProposalCreatorConfig
+
+
+class TestBulkEmail(BaseProposalCreatorConfig):
+
+    def followers(self):
+        followers = db.select([proposal_follower.c.user_id]) \
+            .where(proposal_follower.c.proposal_id == self.proposal.id)
+        return User.id.in_(followers)
+
+    def test_bulk_envelope_skips_unsubscribed_followers(self):
+        self.proposal.follow(self.user, True)
+        self.proposal.follow(self.other_user, True)
+        self.other_user.settings.unsubscribe_emails()
+        db.session.commit()
+
+        envelopes = make_bulk_envelopes('followed_proposal_update', {
+            'proposal': self.proposal,
+            'proposal_url': 'http://localhost/proposals/1',
+        }, self.followers())
+        self.assertEqual(len(envelopes), 1)
+
+        mail = envelopes[0].get()
+        self.assertEqual(len(mail['personalizations']), 1)
+        personalization = mail['personalizations'][0]
+        self.assertEqual(personalization['to'][0]['email'], self.user.email_address)
+        self.assertIn(self.user.email_verification.code, personalization['substitutions'][UNSUBSCRIBE_URL_TOKEN])
+        # the shared body carries the token, not anyone's unsubscribe code
+        self.assertIn(UNSUBSCRIBE_URL_TOKEN, mail['content'][0]['value'])
+
+    def test_bulk_envelope_without_recipients(self):
+        envelopes = make_bulk_envelopes('followed_proposal_update', {
+            'proposal': self.proposal,
+            'proposal_url': 'http://localhost/proposals/1',
+        }, self.followers())
+        self.assertEqual(envelopes, [])
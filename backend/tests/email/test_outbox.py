@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mock import patch
+from sendgrid.helpers.mail import Email, Mail, Content
+
+from grant.e2e import views as e2e_views
+from grant.email.models import EmailOutbox
+from grant.email.outbox import (
+    EmailDeliveryException,
+    StubTransport,
+    deliver_due,
+    queue_envelopes,
+)
+from grant.extensions import db
+
+from grant.task.models import Task
+
+from ..config import BaseTestConfig
+
+
+def make_mail(to):
+    mail = Mail(
+        from_email=Email('noreply@grants.urbit.org'),
+        to_email=Email(to),
+        subject='Hello',
+    )
+    mail.add_content(Content('text/plain', 'Hello there'))
+    mail.___type = 'signup'
+    mail.___to = to
+    return mail
+
+
+class FlakyTransport:
+    def __init__(self, transient):
+        self.transient = transient
+
+    def send(self, payload):
+        raise EmailDeliveryException('nope', transient=self.transient)
+
+
+class TestEmailOutbox(BaseTestConfig):
+
+    def test_queued_mail_is_delivered_once(self):
+        queue_envelopes([make_mail('a@example.com'), make_mail('b@example.com')])
+        transport = StubTransport()
+        self.assertEqual(deliver_due(transport), 2)
+        self.assertEqual(deliver_due(transport), 0)
+        self.assertEqual(len(transport.sent), 2)
+        self.assertEqual(EmailOutbox.query.filter(EmailOutbox.sent_at != None).count(), 2)
+
+    def test_pooled_delivery_with_stub_transport(self):
+        queue_envelopes([make_mail('a@example.com'), make_mail('b@example.com')])
+        transport = StubTransport()
+        # pool threads have no app context
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(deliver_due(transport, pool=pool), 2)
+        self.assertEqual(len(transport.sent), 2)
+        self.assertEqual(EmailOutbox.query.filter(EmailOutbox.sent_at != None).count(), 2)
+        self.assertEqual(EmailOutbox.query.filter(EmailOutbox.attempts > 0).count(), 0)
+
+    def test_e2e_delivery_leaves_the_callers_session_alone(self):
+        db.session.add(Task(job_type=1, blob={}, execute_after=datetime.now()))
+        with patch('grant.email.outbox.E2E_TESTING', True):
+            queue_envelopes([make_mail('a@example.com')])
+        self.assertEqual(e2e_views.last_email['personalizations'][0]['to'][0]['email'], 'a@example.com')
+        self.assertEqual(EmailOutbox.query.filter(EmailOutbox.sent_at != None).count(), 1)
+        # still pending, so rolling back drops it
+        db.session.rollback()
+        self.assertEqual(Task.query.count(), 0)
+
+    def test_transient_failure_is_retried_later(self):
+        queue_envelopes([make_mail('a@example.com')])
+        deliver_due(FlakyTransport(transient=True))
+        email = EmailOutbox.query.first()
+        self.assertEqual(email.attempts, 1)
+        self.assertFalse(email.dead)
+        self.assertIsNone(email.sent_at)
+        # backed off, so not due again yet
+        self.assertEqual(deliver_due(StubTransport()), 0)
+
+    def test_permanent_failure_is_dead_lettered(self):
+        queue_envelopes([make_mail('a@example.com')])
+        deliver_due(FlakyTransport(transient=False))
+        email = EmailOutbox.query.first()
+        self.assertTrue(email.dead)
+        self.assertIn('nope', email.last_error)
@@ -0,0 +1,44 @@
+from grant.admin.example_emails import example_email_args, FakeMilestone, FakeProposal
+from grant.email.render import RenderCache, render_cache
+from grant.email.send import generate_email, get_info_lookup, UNSUBSCRIBE_URL_TOKEN
+
+from ..config import BaseTestConfig
+
+
+class TestEmailRender(BaseTestConfig):
+
+    def test_cached_render_matches_uncached(self):
+        for type in get_info_lookup:
+            args = example_email_args[type]
+            render_cache.clear()
+            cold = generate_email(type, args, unsubscribe_url='http://example.com/unsub?code=a&b')
+            warm = generate_email(type, args, unsubscribe_url='http://example.com/unsub?code=a&b')
+            # html & text layouts
+            self.assertEqual(render_cache.hits, 2, type)
+            self.assertEqual(cold, warm, type)
+            self.assertNotIn(UNSUBSCRIBE_URL_TOKEN, warm['html'])
+            self.assertIn('http://example.com/unsub?code=a&amp;b', warm['html'])
+            self.assertIn('http://example.com/unsub?code=a&b', warm['text'])
+
+    def test_changed_args_miss_the_cache(self):
+        proposal = FakeProposal()
+        args = {**example_email_args['milestone_accept'], 'proposal': proposal}
+        first = generate_email('milestone_accept', args)
+        # the same proposal, onto its next milestone
+        proposal.current_milestone = FakeMilestone()
+        proposal.current_milestone.title = 'Second milestone'
+        second = generate_email('milestone_accept', args)
+        self.assertIn('Second milestone', second['info']['subject'])
+        self.assertIn('Second milestone', second['html'])
+        self.assertIn('Second milestone', second['text'])
+        self.assertNotEqual(first['html'], second['html'])
+
+    def test_render_cache_is_bounded(self):
+        cache = RenderCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
@@ -1,7 +1,11 @@
 import json
+from datetime import datetime, timedelta
 
 from mock import patch
+from sqlalchemy import event
+from werkzeug.http import http_date
 
+from grant.milestone.models import Milestone
 from grant.proposal.models import Proposal, db
 from grant.utils.enums import ProposalStatus
 from ..config import BaseProposalCreatorConfig
@@ -176,6 +180,194 @@ class TestProposalAPI(BaseProposalCreatorConfig):
             for team_member in each_proposal["team"]:
                 self.assertIsNone(team_member.get('email_address'))
 
+    def test_get_proposals_search_relevance(self):
+        for title in ['Urbit hosting', 'Hosting guide', 'Unrelated']:
+            Proposal.create(
+                status=ProposalStatus.LIVE,
+                title=title,
+                brief='brief',
+                content='content',
+                category=test_proposal["category"],
+                target='1',
+            )
+        db.session.commit()
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"search": "hosting", "sort": "RELEVANCE"})
+        self.assert200(resp)
+        self.assertEqual(sorted(p["title"] for p in resp.json["items"]), ['Hosting guide', 'Urbit hosting'])
+
+    def test_get_proposal_etag(self):
+        self.test_publish_proposal_approved()
+        url = "/api/v1/proposals/{}".format(self.proposal.id)
+        resp = self.app.get(url)
+        self.assert200(resp)
+        etag = resp.headers["ETag"]
+
+        resp = self.app.get(url, headers={"If-None-Match": etag})
+        self.assertStatus(resp, 304)
+        self.assertEqual(resp.data, b"")
+
+        # milestones are part of the proposal, so editing one changes the etag
+        self.proposal.milestones[0].title = "Renamed milestone"
+        db.session.commit()
+        resp = self.app.get(url, headers={"If-None-Match": etag})
+        self.assert200(resp)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+
+    def test_get_proposal_etag_follows_team(self):
+        self.test_publish_proposal_approved()
+        url = "/api/v1/proposals/{}".format(self.proposal.id)
+        etag = self.app.get(url).headers["ETag"]
+
+        # team members are serialized inside the proposal
+        user = self.user
+        user.display_name = "Renamed member"
+        db.session.commit()
+        resp = self.app.get(url, headers={"If-None-Match": etag})
+        self.assert200(resp)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+
+    def test_get_proposals_last_modified_after_delete(self):
+        self.test_publish_proposal_approved()
+        db.session.execute(Proposal.__table__.update().values(date_updated=datetime.now() - timedelta(hours=1)))
+        db.session.commit()
+        modified = self.app.get("/api/v1/proposals/").headers["Last-Modified"]
+
+        db.session.delete(self.other_proposal)
+        db.session.commit()
+        resp = self.app.get("/api/v1/proposals/", headers={"If-Modified-Since": modified})
+        self.assert200(resp)
+
+    def test_get_proposals_last_modified(self):
+        self.test_publish_proposal_approved()
+        updated = datetime.now().replace(microsecond=500000) - timedelta(hours=1)
+        db.session.execute(Proposal.__table__.update().values(date_updated=updated))
+        db.session.commit()
+        resp = self.app.get("/api/v1/proposals/")
+        self.assert200(resp)
+        modified = resp.headers["Last-Modified"]
+        # rounded up to the next second
+        self.assertEqual(modified, http_date(updated.replace(microsecond=0) + timedelta(seconds=1)))
+
+        resp = self.app.get("/api/v1/proposals/", headers={"If-Modified-Since": modified})
+        self.assertStatus(resp, 304)
+
+    def test_get_proposals_last_modified_same_second(self):
+        self.test_publish_proposal_approved()
+        # changed in a second that isn't over yet, which a later write could share
+        db.session.execute(Proposal.__table__.update().values(date_updated=datetime.now() + timedelta(seconds=5)))
+        db.session.commit()
+        resp = self.app.get("/api/v1/proposals/")
+        self.assert200(resp)
+        self.assertNotIn("Last-Modified", resp.headers)
+
+        resp = self.app.get("/api/v1/proposals/", headers={"If-Modified-Since": http_date(datetime.now())})
+        self.assert200(resp)
+
+    def test_get_proposals_sparse_fields(self):
+        self.test_publish_proposal_approved()
+        resp = self.app.get("/api/v1/proposals/", query_string={"fields": "id,title"})
+        self.assert200(resp)
+        for each_proposal in resp.json["items"]:
+            self.assertEqual(set(each_proposal.keys()), {"id", "title"})
+
+        resp = self.app.get("/api/v1/proposals/{}".format(self.proposal.id), query_string={"exclude": "content"})
+        self.assert200(resp)
+        self.assertNotIn("content", resp.json)
+        self.assertIn("milestones", resp.json)
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"fields": "id,dateCreated"})
+        self.assert200(resp)
+        for each_proposal in resp.json["items"]:
+            self.assertEqual(set(each_proposal.keys()), {"id", "dateCreated"})
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"fields": "id,nope"})
+        self.assert400(resp)
+        self.assertNotIn("Schema", resp.json["message"])
+
+    def test_get_proposals_cursor(self):
+        for i in range(11):
+            p = Proposal.create(
+                status=ProposalStatus.LIVE,
+                title=f'Cursor proposal {i}',
+                brief='brief',
+                content='content',
+                category=test_proposal["category"],
+                target='1',
+            )
+            p.date_published = datetime.now() - timedelta(days=i)
+        db.session.commit()
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"cursor": ""})
+        self.assert200(resp)
+        self.assertEqual(resp.json["total"], 11)
+        self.assertEqual(len(resp.json["items"]), 9)
+        self.assertIsNotNone(resp.json["nextCursor"])
+        first_ids = [p["id"] for p in resp.json["items"]]
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"cursor": resp.json["nextCursor"]})
+        self.assert200(resp)
+        self.assertIsNone(resp.json["total"])
+        self.assertEqual(len(resp.json["items"]), 2)
+        self.assertIsNone(resp.json["nextCursor"])
+        self.assertFalse(set(first_ids) & set(p["id"] for p in resp.json["items"]))
+        self.assertEqual(resp.json["items"][-1]["title"], 'Cursor proposal 10')
+
+    def test_get_proposals_bad_cursor(self):
+        resp = self.app.get("/api/v1/proposals/", query_string={"cursor": "not-a-cursor"})
+        self.assert400(resp)
+        self.assertIn("invalid cursor", resp.json["message"])
+
+        resp = self.app.get("/api/v1/proposals/", query_string={"sort": "RELEVANCE"})
+        self.assert400(resp)
+
+    def test_get_proposals_query_count(self):
+        def make_live_proposals(count):
+            for i in range(count):
+                p = Proposal.create(
+                    status=ProposalStatus.LIVE,
+                    title=f'Query count proposal {i}',
+                    brief='brief',
+                    content='content',
+                    category=test_proposal["category"],
+                    target='1',
+                )
+                p.date_published = datetime.now()
+                p.team.append(self.user)
+                Milestone.make([{
+                    "title": "Milestone",
+                    "content": "Content",
+                    "date_estimated": (datetime.now() + timedelta(days=30)).timestamp(),
+                    "payout_amount": 1,
+                    "immediate_payout": False
+                }], p)
+            db.session.commit()
+
+        def count_page_queries():
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, *args):
+                # paginate() only counts the total when the page is full, leave that out
+                if not statement.lstrip().upper().startswith("SELECT COUNT("):
+                    statements.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+            resp = self.app.get("/api/v1/proposals/")
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+            self.assert200(resp)
+            return len(resp.json["items"]), len(statements)
+
+        make_live_proposals(2)
+        small_items, small_count = count_page_queries()
+        make_live_proposals(7)
+        full_items, full_count = count_page_queries()
+
+        self.assertEqual(small_items, 2)
+        self.assertEqual(full_items, 9)
+        # relations are batch loaded, so a full page costs the same as a nearly empty one
+        self.assertEqual(small_count, full_count)
+        self.assertLessEqual(full_count, 10)
+
     def test_follow_proposal(self):
         # not logged in
         resp = self.app.put(
@@ -223,3 +415,22 @@ class TestProposalAPI(BaseProposalCreatorConfig):
         self.assertEqual(len(self.proposal.followers), 0)
         self.assertEqual(len(self.user.followed_proposals), 0)
 
+    def test_follow_proposal_repeated(self):
+        self.login_default_user()
+        self.proposal.status = ProposalStatus.LIVE
+        db.session.commit()
+        url = f"/api/v1/proposals/{self.proposal.id}"
+
+        for is_follow in [True, True, False, False, True]:
+            resp = self.app.put(
+                f"{url}/follow",
+                data=json.dumps({'isFollow': is_follow}),
+                content_type='application/json'
+            )
+            self.assert200(resp)
+            resp = self.app.get(url)
+            db.session.expire_all()
+            self.assertEqual(resp.json["followersCount"], len(Proposal.query.get(self.proposal.id).followers))
+
+        self.assertEqual(resp.json["followersCount"], 1)
+
@@ -1,5 +1,6 @@
 import json
 
+from grant.comment.models import Comment
 from grant.proposal.models import Proposal, db
 from grant.utils.enums import ProposalStatus
 from ..config import BaseUserConfig
@@ -33,6 +34,40 @@ class TestProposalCommentAPI(BaseUserConfig):
         )
         self.assertStatus(comment_res, 201)
 
+    def test_proposal_comments_count(self):
+        self.login_default_user()
+        proposal = Proposal(status=ProposalStatus.LIVE)
+        db.session.add(proposal)
+        db.session.commit()
+        proposal_id = proposal.id
+
+        comment_res = self.app.post(
+            "/api/v1/proposals/{}/comments".format(proposal_id),
+            data=json.dumps(test_comment),
+            content_type='application/json'
+        )
+        self.assertStatus(comment_res, 201)
+        self.assertEqual(Proposal.query.get(proposal_id).comments_count, 1)
+
+        comment = Comment.query.get(comment_res.json["id"])
+        comment.hide(True)
+        db.session.commit()
+        self.assertEqual(Proposal.query.get(proposal_id).comments_count, 0)
+
+        # hiding it again is not a change
+        comment.hide(True)
+        db.session.commit()
+        self.assertEqual(Proposal.query.get(proposal_id).comments_count, 0)
+
+        comment.hide(False)
+        db.session.commit()
+        self.assertEqual(Proposal.query.get(proposal_id).comments_count, 1)
+
+        Proposal.query.filter_by(id=proposal_id).update({"comments_count": 5})
+        Proposal.reconcile_counts()
+        db.session.commit()
+        self.assertEqual(Proposal.query.get(proposal_id).comments_count, 1)
+
     def test_invalid_proposal_id_create_comment(self):
         self.login_default_user()
         comment_res = self.app.post(
@@ -148,3 +183,60 @@ class TestProposalCommentAPI(BaseUserConfig):
 
         self.assertStatus(comment_res, 403)
         self.assertIn('silenced', comment_res.json['message'])
+
+    def test_get_proposal_comments_loads_whole_threads(self):
+        proposal = Proposal(status=ProposalStatus.LIVE)
+        db.session.add(proposal)
+        db.session.flush()
+
+        def add(parent, content, hidden=False):
+            comment = Comment(proposal.id, self.user.id, parent.id if parent else None, content)
+            comment.hidden = hidden
+            db.session.add(comment)
+            db.session.flush()
+            return comment
+
+        root = add(None, 'root')
+        hidden_parent = add(root, 'hidden parent', hidden=True)
+        add(hidden_parent, 'deep reply')
+        add(root, 'dead reply', hidden=True)
+        db.session.commit()
+        proposal_id = proposal.id
+        db.session.expire_all()
+
+        res = self.app.get(f"/api/v1/proposals/{proposal_id}/comments")
+        self.assert200(res)
+        [thread] = res.json['items']
+        self.assertEqual(thread['content'], 'root')
+        # the hidden reply with a live child stays, the hidden leaf is pruned
+        [reply] = thread['replies']
+        self.assertTrue(reply['hidden'])
+        self.assertEqual([r['content'] for r in reply['replies']], ['deep reply'])
+
+    def test_comment_path_and_replies_page(self):
+        proposal = Proposal(status=ProposalStatus.LIVE)
+        db.session.add(proposal)
+        db.session.flush()
+        root = Comment(proposal.id, self.user.id, None, 'root')
+        db.session.add(root)
+        db.session.flush()
+        reply = Comment(proposal.id, self.user.id, root.id, 'reply')
+        db.session.add(reply)
+        db.session.flush()
+        nested = Comment(proposal.id, self.user.id, reply.id, 'nested')
+        dead = Comment(proposal.id, self.user.id, root.id, 'dead')
+        dead.hidden = True
+        db.session.add_all([nested, dead])
+        db.session.commit()
+
+        self.assertEqual(nested.depth, 2)
+        self.assertTrue(nested.path.startswith(reply.path))
+        self.assertEqual({c.id for c in root.subtree()}, {reply.id, nested.id, dead.id})
+        self.assertEqual({c.id for c in root.subtree(max_depth=1)}, {reply.id, dead.id})
+
+        res = self.app.get(f"/api/v1/proposals/{proposal.id}/comments/{root.id}/replies")
+        self.assert200(res)
+        self.assertEqual(res.json['total'], 1)
+        [item] = res.json['items']
+        self.assertEqual(item['content'], 'reply')
+        self.assertEqual([r['content'] for r in item['replies']], ['nested'])
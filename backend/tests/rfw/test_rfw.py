@@ -1,6 +1,7 @@
 import json
 
 from mock import patch
+from sqlalchemy import event
 from animal_case import animalify
 
 from grant.proposal.models import Proposal, db
@@ -530,3 +531,43 @@ class TestRfwApi(BaseUserConfig):
     def test_rfw_api_get(self):
         # unauthenticated
         r = self.app.get('/api/v1/rfws')
+
+    def test_rfw_api_get_bounty_sort_and_filters(self):
+        rfw1 = self.make_rfw()
+        rfw1.update_milestone_by_id(rfw1.milestones[0].id, bounty=10, effort_from=5, effort_to=8)
+        db.session.commit()
+        self.assertEqual(rfw1.bounty, 16)
+
+        r = self.app.get('/api/v1/rfws', query_string={'sort': 'BOUNTY:DESC'})
+        self.assert200(r)
+        self.assertEqual([x['id'] for x in r.json['items']], [rfw1.id, self.rfw0.id])
+
+        r = self.app.get('/api/v1/rfws', query_string={'filters': ['BOUNTY_MIN_10']})
+        self.assertEqual([x['id'] for x in r.json['items']], [rfw1.id])
+
+        r = self.app.get('/api/v1/rfws', query_string={'filters': ['EFFORT_MIN_6', 'EFFORT_MAX_6']})
+        self.assertEqual([x['id'] for x in r.json['items']], [rfw1.id])
+
+    def test_rfw_api_get_query_count(self):
+        def count_page_queries():
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            # the test shares the request's session, start both pages from an empty identity map
+            db.session.expire_all()
+            event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+            r = self.app.get('/api/v1/rfws')
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+            self.assert200(r)
+            return len(r.json['items']), len(statements)
+
+        self.login_default_user()
+        one_rfw = count_page_queries()
+        self.make_rfw()
+        self.make_rfw()
+        three_rfws = count_page_queries()
+        self.assertEqual((one_rfw[0], three_rfws[0]), (1, 3))
+        # workers, claims, milestones and tags are loaded per page, not per RFW
+        self.assertEqual(one_rfw[1], three_rfws[1])
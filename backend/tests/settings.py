@@ -6,6 +6,7 @@ SECRET_KEY = 'not-so-secret-in-tests'
 BCRYPT_LOG_ROUNDS = 4  # For faster tests; needs at least 4 to avoid "ValueError: Invalid rounds"
 DEBUG_TB_ENABLED = False
 CACHE_TYPE = 'simple'  # Can be "memcached", "redis", etc.
+RESPONSE_CACHE_ENABLED = False  # enabled per test, see tests/test_cache.py
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 WTF_CSRF_ENABLED = False  # Allows form testing
 
@@ -1,6 +1,11 @@
 from datetime import datetime
 
-from grant.task.models import Task
+from mock import patch
+
+from grant.task.jobs import JOBS
+from grant.task.models import Task, TaskArchive
+from grant.task.worker import run_worker
+from grant.extensions import db
 
 from ..config import BaseProposalCreatorConfig
 
@@ -22,3 +27,62 @@ class TestTaskAPI(BaseProposalCreatorConfig):
         tasks = Task.query.filter(Task.execute_after <= datetime.now()).filter_by(completed=False).all()
         self.assertEqual(tasks, [])
 
+    def test_failing_task_is_retried_then_dead_lettered(self):
+        def failing_job(task):
+            raise Exception("boom")
+
+        self.make_proposal_reminder_task()
+        task_id = Task.query.first().id
+        with patch.dict(JOBS, {1: failing_job}), \
+                patch('grant.task.worker.TASK_MAX_ATTEMPTS', 2), \
+                patch('grant.task.worker.TASK_RETRY_BACKOFF_SECONDS', 0):
+            self.app.get("/api/v1/task")
+            task = Task.query.get(task_id)
+            self.assertEqual(task.attempts, 1)
+            self.assertFalse(task.dead)
+            self.assertIn("boom", task.last_error)
+
+            self.app.get("/api/v1/task")
+            task = Task.query.get(task_id)
+            self.assertEqual(task.attempts, 2)
+            self.assertTrue(task.dead)
+            self.assertFalse(task.completed)
+
+        # dead tasks are never picked up again
+        self.assertEqual(Task.due(datetime.now()).count(), 0)
+
+    def test_worker_runs_due_tasks(self):
+        self.make_proposal_reminder_task()
+        self.make_proposal_reminder_task()
+        run_worker(self.app.application, pool_size=2, batch_size=1, once=True)
+        db.session.expire_all()
+        tasks = Task.query.all()
+        self.assertEqual(len(tasks), 2)
+        self.assertTrue(all(t.completed for t in tasks))
+
+    def test_worker_survives_failure_path_errors(self):
+        def failing_job(task):
+            raise Exception("boom")
+
+        self.make_proposal_reminder_task()
+        with patch.dict(JOBS, {1: failing_job}), \
+                patch.object(Task, 'mark_failed', side_effect=Exception("no db")):
+            run_worker(self.app.application, pool_size=2, batch_size=1, once=True)
+        db.session.expire_all()
+        task = Task.query.first()
+        self.assertFalse(task.completed)
+        self.assertIsNotNone(task.claimed_until)
+
+    def test_archive_completed_tasks(self):
+        self.make_proposal_reminder_task()
+        self.make_proposal_reminder_task()
+        self.app.get("/api/v1/task")
+        self.make_proposal_reminder_task()
+
+        count = Task.archive_completed(datetime.now(), batch_size=1)
+        self.assertEqual(count, 2)
+        self.assertEqual(TaskArchive.query.count(), 2)
+        # the pending task stays in the hot table
+        tasks = Task.query.all()
+        self.assertEqual(len(tasks), 1)
+        self.assertFalse(tasks[0].completed)
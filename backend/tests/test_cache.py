@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from grant.extensions import cache, db
+from grant.rfp.models import RFP
+from grant.utils.cache import LRUCache
+from grant.utils.enums import RFPStatus, Category
+
+from .config import BaseUserConfig
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(threshold=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+
+
+def test_lru_cache_returns_copies():
+    lru = LRUCache()
+    lru.set('a', {'items': []})
+    lru.get('a')['items'].append(1)
+    assert lru.get('a') == {'items': []}
+
+
+class TestResponseCache(BaseUserConfig):
+
+    def setUp(self):
+        super().setUp()
+        self.app.application.config['RESPONSE_CACHE_ENABLED'] = True
+        with self.app.application.app_context():
+            cache.clear()
+
+    def make_rfp(self, title):
+        return RFP(
+            title=title,
+            brief='brief',
+            content='content',
+            category=Category.COMMUNITY,
+            bounty='10',
+            date_closes=datetime.now() + timedelta(days=30),
+            status=RFPStatus.LIVE,
+        )
+
+    def test_commit_invalidates_cached_list(self):
+        resp = self.app.get("/api/v1/rfps")
+        self.assert200(resp)
+        self.assertEqual(resp.json, [])
+
+        # in the serving app, so the commit reaches its cache like a shared backend would
+        with self.app.application.app_context():
+            db.session.add(self.make_rfp('First RFP'))
+            db.session.commit()
+
+        resp = self.app.get("/api/v1/rfps")
+        self.assertEqual([r['title'] for r in resp.json], ['First RFP'])
@@ -0,0 +1,38 @@
+from mock import patch
+
+from grant.utils.ids import permute, PublicIdAllocator, BLOCK_SIZE, MIN_ID, MAX_ID, ID_SPACE
+from .config import BaseTestConfig, User, db
+
+
+def test_permute_is_unique_and_in_range():
+    key = b'test-key'
+    ids = [permute(n, key) for n in range(5000)]
+    assert len(set(ids)) == len(ids)
+    assert all(MIN_ID <= i <= MAX_ID for i in ids)
+    # edges of the counter space
+    assert MIN_ID <= permute(ID_SPACE - 1, key) <= MAX_ID
+
+
+def test_permute_is_not_sequential():
+    key = b'test-key'
+    ids = [permute(n, key) for n in range(100)]
+    assert ids != sorted(ids)
+
+
+def test_permute_depends_on_key():
+    assert [permute(n, b'a') for n in range(10)] != [permute(n, b'b') for n in range(10)]
+
+
+class TestPublicIdAllocator(BaseTestConfig):
+    def test_skips_ids_taken_by_existing_rows(self):
+        allocator = PublicIdAllocator('test-key')
+        # a row from before permuted ids that holds the block's first id
+        taken = permute(0, b'test-key')
+        db.session.execute(User.__table__.insert().values(
+            id=taken, email_address='old@user.com', password='password', is_admin=False,
+        ))
+        with patch('grant.utils.ids.random.randrange', return_value=0):
+            ids = [allocator.next_id(User) for _ in range(BLOCK_SIZE - 1)]
+        self.assertNotIn(taken, ids)
+        self.assertEqual(ids[0], permute(1, b'test-key'))
+        self.assertEqual(len(set(ids)), BLOCK_SIZE - 1)
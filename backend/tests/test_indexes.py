@@ -0,0 +1,28 @@
+import grant.app  # noqa: F401 imports every model
+from sqlalchemy import UniqueConstraint
+
+from grant.extensions import db
+
+
+def leading_columns(table):
+    # column lists a lookup by their leading columns can use
+    yield [c.name for c in table.primary_key.columns]
+    for index in table.indexes:
+        yield [c.name for c in index.columns]
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            yield [c.name for c in constraint.columns]
+
+
+def is_indexed(table, columns: list):
+    return any(cols[:len(columns)] == columns for cols in leading_columns(table))
+
+
+def test_foreign_keys_are_indexed():
+    unindexed = []
+    for table in db.metadata.sorted_tables:
+        for fk in table.foreign_key_constraints:
+            columns = [c.name for c in fk.columns]
+            if not is_indexed(table, columns):
+                unindexed.append(f'{table.name}({", ".join(columns)})')
+    assert not unindexed, f'Foreign keys without a leading index: {", ".join(unindexed)}'
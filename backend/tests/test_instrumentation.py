@@ -0,0 +1,33 @@
+import json
+
+from .config import BaseProposalCreatorConfig
+
+
+class TestInstrumentation(BaseProposalCreatorConfig):
+
+    def setUp(self):
+        super().setUp()
+        self.app.application.config['INSTRUMENTATION_ENABLED'] = True
+        self.app.application.config['QUERY_BUDGET'] = 1000
+
+    def test_server_timing_header(self):
+        res = self.app.get("/api/v1/proposals/")
+        self.assert200(res)
+        timing = res.headers['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_query_budget_logs_warning(self):
+        self.app.application.config['QUERY_BUDGET'] = 0
+        with self.assertLogs(self.app.application.logger, 'WARNING') as logs:
+            self.app.get("/api/v1/proposals/")
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertTrue(line['over_budget'])
+        self.assertGreater(line['queries'], 0)
+        self.assertEqual(line['path'], "/api/v1/proposals/")
+
+    def test_disabled_by_default(self):
+        self.app.application.config['INSTRUMENTATION_ENABLED'] = False
+        res = self.app.get("/api/v1/proposals/")
+        self.assertNotIn('Server-Timing', res.headers)
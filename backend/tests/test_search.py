@@ -0,0 +1,10 @@
+from grant.utils.search import search_terms, prefix_query
+
+
+def test_search_terms_strip_punctuation():
+    assert search_terms("Urbit's  HOSTING, guide!") == ['urbit', 's', 'hosting', 'guide']
+
+
+def test_prefix_query_matches_every_term_as_prefix():
+    assert prefix_query(['urbit', 'host']) == 'urbit:* & host:*'
+    assert prefix_query([]) == ''
@@ -0,0 +1,90 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from marshmallow import Schema, fields
+
+from grant.comment.models import Comment, comments_schema
+from grant.extensions import db
+from grant.history.models import HistoryEvent, history_events_schema
+from grant.proposal.models import proposals_schema
+from grant.utils import serializers
+
+from .config import BaseProposalCreatorConfig
+
+
+class Thing:
+    def __init__(self, id, name, score=None, created=None):
+        self.id = id
+        self.name = name
+        self.score = score
+        self.created = created
+
+
+class ThingSchema(Schema):
+    class Meta:
+        fields = ("id", "name", "score", "created", "label", "missing")
+
+    label = fields.Method("get_label")
+    missing = fields.String(attribute="not_there")
+    score = fields.Float(data_key="points")
+
+    def get_label(self, obj):
+        return obj.name.upper()
+
+
+class PlainThingSchema(Schema):
+    class Meta:
+        fields = ("id", "name", "score", "created")
+
+    score = fields.Float(data_key="points")
+
+
+def marshmallow_dump(schema, obj):
+    with patch.object(serializers, 'FAST_SERIALIZERS', False):
+        return serializers.dump(schema, obj)
+
+
+def test_compiled_dump_matches_marshmallow():
+    things = [
+        Thing(1, 'a', 2, datetime(2019, 1, 1)),
+        Thing(2, 'b', None, datetime(2019, 1, 2)),
+        Thing(3, 'c', 1.5, None),
+    ]
+    schema = ThingSchema(many=True)
+    assert serializers.dump(schema, things) == marshmallow_dump(ThingSchema(many=True), things)
+    # again, now through the generated function rather than the first marshmallow dump
+    assert serializers.dump(schema, things) == marshmallow_dump(ThingSchema(many=True), things)
+    assert 'missing' not in serializers.dump(schema, things)[0]
+
+
+def test_compiled_dump_keeps_marshmallow_for_mappings():
+    schema = PlainThingSchema()
+    data = {'id': 1, 'name': 'a', 'score': 1, 'created': None}
+    assert serializers.dump(schema, data) == PlainThingSchema().dump(data)
+    assert serializers.dump(schema, data)['points'] == 1.0
+
+
+class TestSerializers(BaseProposalCreatorConfig):
+
+    def test_compiled_dump_matches_marshmallow_on_hot_pages(self):
+        self.proposal.date_published = datetime.now()
+        top = Comment(self.proposal.id, self.user.id, None, 'top')
+        db.session.add(top)
+        db.session.flush()
+        reply = Comment(self.proposal.id, self.other_user.id, top.id, 'reply')
+        hidden = Comment(self.proposal.id, self.other_user.id, top.id, 'hidden')
+        hidden.hidden = True
+        db.session.add_all([reply, hidden])
+        db.session.add(HistoryEvent('title', 'content', user_id=self.user.id, proposal_id=self.proposal.id))
+        db.session.add(HistoryEvent('bare', 'content'))
+        db.session.commit()
+
+        pages = [
+            (proposals_schema, [self.proposal]),
+            (comments_schema, Comment.query.filter_by(parent_comment_id=None).all()),
+            (history_events_schema, HistoryEvent.query.all()),
+        ]
+        for schema, items in pages:
+            expected = marshmallow_dump(schema, items)
+            self.assertEqual(serializers.dump(schema, items), expected)
+            self.assertEqual(serializers.dump(schema, items), expected)